@@ -0,0 +1,377 @@
+"""
+Functions for backtesting competition parameters on past matches.
+
+Matches are loaded from the database once, then ratings and predictions are
+replayed in memory for many sets of competition parameters at a time, without
+writing to the database.
+"""
+
+import dataclasses
+import itertools
+import math
+import numpy as np
+import pandas as pd
+from . import db, model, scoring, scrape
+from .data import BacktestSeason, CompetitionParams, Performance, RatingWindow
+
+
+class RatingWindows:
+    """RatingWindow over several sets of competition parameters at once.
+
+    Each performance is an array with one value per parameter set. Sums are
+    updated and recomputed exactly as in RatingWindow, so ratings match those
+    of run_seasons.
+    """
+
+    __slots__ = ("_values", "_head", "_len", "sum", "weighted_sum")
+
+    def __init__(self, mp: np.ndarray):
+        """Creates window holding a single performance per parameter set.
+
+        Args:
+            mp (np.ndarray): initial performance per parameter set
+        """
+        self._values = np.zeros((RatingWindow.SIZE, len(mp)))
+        self._head = 0
+        self._len = 0
+        self.sum = np.zeros(len(mp))
+        self.weighted_sum = np.zeros(len(mp))
+        self.push(mp)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def push(self, mp: np.ndarray):
+        """Adds newest performance per parameter set, evicting the oldest if
+        full.
+
+        Args:
+            mp (np.ndarray): match performance per parameter set
+        """
+        evicted = 0.0
+        if self._len == RatingWindow.SIZE:
+            evicted = self._values[(self._head - 1) % RatingWindow.SIZE]
+        else:
+            self._len += 1
+        self.weighted_sum = self.weighted_sum + (mp - RatingWindow.STEP * self.sum)
+        self.sum = self.sum + (mp - evicted)
+        self._head = (self._head - 1) % RatingWindow.SIZE
+        self._values[self._head] = mp
+
+        if self._head == 0:
+            self.sum = np.zeros(len(mp))
+            self.weighted_sum = np.zeros(len(mp))
+            for i in range(self._len):
+                self.sum = self.sum + self._values[i]
+                self.weighted_sum = (
+                    self.weighted_sum + self._values[i] * RatingWindow.WEIGHTS[i]
+                )
+
+    @property
+    def rating(self) -> np.ndarray:
+        """Weighted average of performances in window, per parameter set."""
+        return self.weighted_sum / RatingWindow.NORMS[self._len]
+
+    @property
+    def shifted_weighted_sum(self) -> np.ndarray:
+        """Weighted sum of performances after one more performance is pushed,
+        excluding the pushed performance itself, per parameter set."""
+        return self.weighted_sum - RatingWindow.STEP * self.sum
+
+
+def get_competition_params(competition_id: int) -> CompetitionParams:
+    """Gets competition's current parameters from database.
+
+    Args:
+        competition_id (int): competition's db id, ex. 1 for Premier League
+
+    Returns:
+        CompetitionParams: competition's parameters
+    """
+    competition = db.get_competition_by_id(competition_id)
+    if competition is None:
+        raise ValueError(f"Invalid competition id: {competition_id} is not in database")
+    if (
+        competition.avg_base is None
+        or competition.home_advantage is None
+        or competition.transfer_off_slope is None
+        or competition.transfer_def_slope is None
+        or competition.transfer_int is None
+    ):
+        raise Exception(
+            f"{competition.name} is missing one or more of the following fields: avg_base, home_advantage, transfer_off_slope, transfer_def_slope, transfer_int"
+        )
+    return CompetitionParams(
+        avg_base=competition.avg_base,
+        home_advantage=competition.home_advantage,
+        transfer_off_slope=competition.transfer_off_slope,
+        transfer_def_slope=competition.transfer_def_slope,
+        transfer_int=competition.transfer_int,
+    )
+
+
+def load_seasons(competition_id: int, start: int, end: int) -> list[BacktestSeason]:
+    """Loads everything needed to replay given competition's seasons.
+
+    Args:
+        competition_id (int): competition's db id, ex. 1 for Premier League
+        start (int): earlier year of first season (ex. 2016 means 2016/17)
+        end (int): later year of final season to include (ex. 2025 means
+            2024/25)
+
+    Returns:
+        list[BacktestSeason]: one BacktestSeason per season, in order
+    """
+    seasons: list[BacktestSeason] = []
+    for season in range(start, end):
+        matches: list[tuple[int, int, float, float, int, int]] = []
+        for m in db.get_matches(competition_id, season, completed=True):
+            if m.ag_1 is None or m.ag_2 is None or m.xg_1 is None or m.xg_2 is None:
+                raise Exception(f"Match with id {m.id} is missing ag or xg stats.")
+            if m.score_1 is None or m.score_2 is None:
+                raise Exception(f"Match with id {m.id} is missing scores.")
+            matches.append(
+                (
+                    m.club_id_1,
+                    m.club_id_2,
+                    model.compute_comp_score(m.ag_1, m.xg_1),
+                    model.compute_comp_score(m.ag_2, m.xg_2),
+                    m.score_1,
+                    m.score_2,
+                )
+            )
+
+        seasons.append(
+            BacktestSeason(
+                season=season,
+                club_ids=[c.id for c in db.get_clubs(competition_id, season)],
+                preseason_zs=db.get_transfervalues_z(competition_id, season),
+                previous_avgs=(
+                    scrape.Fotmob().get_season_avgs(competition_id, season - 1)
+                    if season == start
+                    else {}
+                ),
+                matches=matches,
+            )
+        )
+    return seasons
+
+
+def replay(
+    seasons: list[BacktestSeason],
+    params: list[CompetitionParams],
+    lookup: bool = False,
+) -> list[Performance]:
+    """Replays run_seasons' ratings and predictions for each parameter set.
+
+    All parameter sets are replayed together, with each rating held as an
+    array over parameter sets.
+
+    Args:
+        seasons (list[BacktestSeason]): consecutive seasons, from load_seasons
+        params (list[CompetitionParams]): parameter sets to replay
+        lookup (bool, optional): if True, compute outcome probabilities using
+            lookup table (see model.compute_outcome_probs). Defaults to False.
+
+    Returns:
+        list[Performance]: model performance per parameter set, with total
+            RPS, IGN, and BS over mp matches
+    """
+    avg_base = np.array([p.avg_base for p in params])
+    home_advantage = np.array([p.home_advantage for p in params])
+    transfer_off_slope = np.array([p.transfer_off_slope for p in params])
+    transfer_def_slope = np.array([p.transfer_def_slope for p in params])
+    transfer_int = np.array([p.transfer_int for p in params])
+
+    rps = np.zeros(len(params))
+    ign = np.zeros(len(params))
+    bs = np.zeros(len(params))
+    mp = 0
+
+    # club id -> (off rating, def rating) at end of previous season
+    previous_ratings: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+
+    for i, s in enumerate(seasons):
+        windows: dict[int, tuple[RatingWindows, RatingWindows]] = {}
+        for club_id in s.club_ids:
+            if i == 0:
+                avgs = s.previous_avgs.get(club_id)
+            else:
+                avgs = previous_ratings.get(club_id)
+
+            zs = s.preseason_zs[club_id]
+            if avgs is not None:
+                starting_off = avgs[0] * (2 / 3) + (
+                    transfer_off_slope * zs[0] + transfer_int
+                ) * (1 / 3)
+                starting_def = avgs[1] * (2 / 3) + (
+                    transfer_def_slope * zs[1] + transfer_int
+                ) * (1 / 3)
+            else:
+                starting_off = transfer_off_slope * zs[0] + transfer_int
+                starting_def = transfer_def_slope * zs[1] + transfer_int
+
+            windows[club_id] = (
+                RatingWindows(starting_off),
+                RatingWindows(starting_def),
+            )
+
+        proj_goals = np.empty((2, len(s.matches), len(params)))
+        for k, (club_id_1, club_id_2, comp_score_1, comp_score_2, _, _) in enumerate(
+            s.matches
+        ):
+            mp_off_1, mp_def_1 = windows[club_id_1]
+            mp_off_2, mp_def_2 = windows[club_id_2]
+            off_1, def_1 = mp_off_1.rating, mp_def_1.rating
+            off_2, def_2 = mp_off_2.rating, mp_def_2.rating
+
+            proj_goals[0, k] = model.compute_projected_goals_array(
+                off_1,
+                mp_off_1.shifted_weighted_sum,
+                len(mp_off_1),
+                def_2,
+                True,
+                avg_base,
+                home_advantage,
+            )
+            proj_goals[1, k] = model.compute_projected_goals_array(
+                off_2,
+                mp_off_2.shifted_weighted_sum,
+                len(mp_off_2),
+                def_1,
+                False,
+                avg_base,
+                home_advantage,
+            )
+
+            mp_off_1.push(
+                model.compute_mp_array(
+                    comp_score_1, def_2, True, True, avg_base, home_advantage
+                )
+            )
+            mp_def_1.push(
+                model.compute_mp_array(
+                    comp_score_2, off_2, True, False, avg_base, home_advantage
+                )
+            )
+            mp_off_2.push(
+                model.compute_mp_array(
+                    comp_score_2, def_1, False, True, avg_base, home_advantage
+                )
+            )
+            mp_def_2.push(
+                model.compute_mp_array(
+                    comp_score_1, off_1, False, False, avg_base, home_advantage
+                )
+            )
+
+        previous_ratings = {
+            cid: (w[0].rating, w[1].rating) for cid, w in windows.items()
+        }
+        if not s.matches:
+            continue
+
+        prob_1, prob_2, prob_d = model.compute_outcome_probs(
+            proj_goals[0], proj_goals[1], lookup
+        )
+        # one row per (match, parameter set)
+        probs = np.stack([prob_1, prob_d, prob_2], axis=2).reshape(-1, 3)
+        scores = np.array([m[4:] for m in s.matches])
+        outcomes = np.repeat(
+            scoring.compute_outcomes(scores[:, 0], scores[:, 1]), len(params), axis=0
+        )
+        shape = (len(s.matches), len(params))
+        rps += scoring.compute_rps_array(probs, outcomes).reshape(shape).sum(axis=0)
+        ign += scoring.compute_ign_array(probs, outcomes).reshape(shape).sum(axis=0)
+        bs += scoring.compute_bs_array(probs, outcomes).reshape(shape).sum(axis=0)
+        mp += len(s.matches)
+
+    return [
+        Performance(rps=float(rps[j]), ign=float(ign[j]), bs=float(bs[j]), mp=mp)
+        for j in range(len(params))
+    ]
+
+
+def _replay_chunk(
+    args: tuple[list[BacktestSeason], list[CompetitionParams], bool],
+) -> list[Performance]:
+    """Calls replay with (seasons, params, lookup) in a worker process."""
+    return replay(*args)
+
+
+def sweep(
+    seasons: list[BacktestSeason],
+    params: list[CompetitionParams],
+    lookup: bool = False,
+    chunksize: int | None = None,
+) -> pd.DataFrame:
+    """Evaluates parameter sets in parallel using the simulation worker pool.
+
+    Args:
+        seasons (list[BacktestSeason]): consecutive seasons, from load_seasons
+        params (list[CompetitionParams]): parameter sets to evaluate
+        lookup (bool, optional): if True, compute outcome probabilities using
+            lookup table (see model.compute_outcome_probs). Defaults to False.
+        chunksize (int | None, optional): parameter sets replayed together by
+            each worker task. Defaults to None (split evenly across workers).
+
+    Returns:
+        pd.DataFrame: dataframe with one row per parameter set, in order: its
+            parameters, average RPS, IGN, and BS, and number of matches
+    """
+    if not params:
+        return pd.DataFrame()
+    if chunksize is None:
+        chunksize = math.ceil(len(params) / model.PROCESSES)
+
+    chunks = [params[i : i + chunksize] for i in range(0, len(params), chunksize)]
+    performances = [
+        p
+        for chunk in model.get_sim_pool().imap(
+            _replay_chunk, [(seasons, chunk, lookup) for chunk in chunks]
+        )
+        for p in chunk
+    ]
+
+    df = pd.DataFrame([dataclasses.asdict(p) for p in params])
+    df["avg_rps"] = [p.rps / p.mp for p in performances]
+    df["avg_ign"] = [p.ign / p.mp for p in performances]
+    df["avg_bs"] = [p.bs / p.mp for p in performances]
+    df["count"] = [p.mp for p in performances]
+    return df
+
+
+def param_grid(
+    base: CompetitionParams, **values: list[float]
+) -> list[CompetitionParams]:
+    """Builds every combination of given parameter values.
+
+    Args:
+        base (CompetitionParams): parameters to use for fields not given
+        **values (list[float]): field name -> values to try, ex.
+            avg_base=[1.3, 1.35, 1.4]
+
+    Returns:
+        list[CompetitionParams]: one parameter set per combination
+    """
+    names = list(values.keys())
+    return [
+        dataclasses.replace(base, **dict(zip(names, combination)))
+        for combination in itertools.product(*values.values())
+    ]
+
+
+if __name__ == "__main__":
+    seasons = load_seasons(1, 2017, 2025)
+    base = get_competition_params(1)
+    # sweep only needs loaded seasons, so release lock on db file meanwhile
+    db.close()
+    df = sweep(
+        seasons,
+        param_grid(
+            base,
+            avg_base=[base.avg_base - 0.05, base.avg_base, base.avg_base + 0.05],
+            home_advantage=[base.home_advantage - 0.05, base.home_advantage],
+        ),
+    )
+    print(df.sort_values("avg_rps").to_string())
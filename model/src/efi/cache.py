@@ -0,0 +1,310 @@
+"""
+On-disk cache of HTTP responses fetched by scrapers.
+
+Responses are stored in files named by the sha256 of their url. Permanent
+entries (completed matches, finished seasons) never expire; live entries (ex.
+current season's fixtures) are refetched once older than their TTL.
+
+Setting EFI_HTTP_MODE=record archives every fetched response into a bundle at
+EFI_HTTP_BUNDLE; EFI_HTTP_MODE=replay then serves all requests from the bundle
+without network access. Both modes bypass the cache, so every request reaches
+the bundle.
+"""
+
+import hashlib
+import json
+import os
+import requests
+import sqlite3
+import threading
+import time
+import zlib
+from .ratelimit import RateLimiter
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable
+
+CACHE_DIR = "data/http_cache"  # cached response bodies, named by url sha256
+CACHE_TTL = 60 * 60  # seconds before a live response is refetched
+SEASON_END = (7, 1)  # (month, day) by which a season is over, ex. July 1, 2017
+
+HTTP_BUNDLE = "data/http_bundle.sqlite"  # record/replay bundle, if not set in env
+LIVE = "live"  # fetch from network, through cache
+RECORD = "record"  # fetch from network, archiving responses in bundle
+REPLAY = "replay"  # serve responses from bundle, without network
+
+_lock = threading.Lock()  # guards hit and miss counts across threads
+_hits = 0  # responses served from cache
+_misses = 0  # responses fetched live
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    status_code: int
+    content: bytes
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+def get_mode() -> str:
+    """Gets HTTP mode set by EFI_HTTP_MODE env var.
+
+    Raises:
+        ValueError: invalid mode
+
+    Returns:
+        str: LIVE (default), RECORD, or REPLAY
+    """
+    mode = os.getenv("EFI_HTTP_MODE", LIVE).lower()
+    if mode not in (LIVE, RECORD, REPLAY):
+        raise ValueError(f"Invalid EFI_HTTP_MODE: {mode}")
+    return mode
+
+
+def get_bundle_path() -> str:
+    """Gets path of record/replay bundle set by EFI_HTTP_BUNDLE env var.
+
+    Returns:
+        str: bundle path, defaulting to HTTP_BUNDLE
+    """
+    return os.getenv("EFI_HTTP_BUNDLE", HTTP_BUNDLE)
+
+
+def record(url: str, status_code: int, content: bytes):
+    """Archives fetched response in bundle, if recording.
+
+    Args:
+        url (str): request url, including query string
+        status_code (int): response status code
+        content (bytes): response body
+    """
+    if get_mode() != RECORD:
+        return
+    path = get_bundle_path()
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _lock, sqlite3.connect(path) as con:
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                status_code INTEGER NOT NULL,
+                content BLOB NOT NULL -- zlib compressed body
+            )
+            """)
+        con.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+            [url, status_code, zlib.compress(content)],
+        )
+
+
+def replay(url: str) -> CachedResponse:
+    """Gets recorded response from bundle.
+
+    Args:
+        url (str): request url, including query string
+
+    Raises:
+        ValueError: url was not recorded in bundle
+
+    Returns:
+        CachedResponse: recorded response
+    """
+    path = get_bundle_path()
+    row = None
+    if os.path.exists(path):
+        with sqlite3.connect(path) as con:
+            row = con.execute(
+                "SELECT status_code, content FROM responses WHERE url = ?", [url]
+            ).fetchone()
+    if row is None:
+        raise ValueError(f"{url} is not recorded in HTTP bundle {path}")
+    return CachedResponse(url, row[0], zlib.decompress(row[1]))
+
+
+def fetch(
+    url: str, session: requests.Session | None = None, **kwargs
+) -> CachedResponse:
+    """Makes GET request, bypassing cache, unless replaying from bundle.
+
+    Args:
+        url (str): request url, including query string
+        session (requests.Session | None, optional): session to fetch with.
+            Defaults to None (requests.get).
+        **kwargs: passed to requests.get
+
+    Returns:
+        CachedResponse: fetched or replayed response
+    """
+    if get_mode() == REPLAY:
+        return replay(url)
+    r = (session or requests).get(url, **kwargs)
+    record(url, r.status_code, r.content)
+    return CachedResponse(url, r.status_code, r.content)
+
+
+def is_season_over(season: int) -> bool:
+    """Checks whether given season has ended, so its pages no longer change.
+
+    Args:
+        season (int): earlier year of season (ex. 2016 means 2016/17)
+
+    Returns:
+        bool: True if season is over
+    """
+    return date.today() >= date(season + 1, *SEASON_END)
+
+
+def get_entry_path(url: str, permanent: bool) -> str:
+    """Gets path of url's cache entry.
+
+    Args:
+        url (str): request url, including query string
+        permanent (bool): whether entry is permanent or live
+
+    Returns:
+        str: path to entry, under CACHE_DIR
+    """
+    key = hashlib.sha256(url.encode()).hexdigest()
+    return os.path.join(CACHE_DIR, "permanent" if permanent else "live", key[:2], key)
+
+
+def load(
+    url: str, permanent: bool = False, ttl: float = CACHE_TTL
+) -> CachedResponse | None:
+    """Loads url's response from cache, counting a hit or miss.
+
+    A permanent entry is used for any request. Unless permanent is set, a live
+    entry is also used if fetched within ttl seconds.
+
+    Args:
+        url (str): request url, including query string
+        permanent (bool, optional): if True, only use permanent entries.
+            Defaults to False.
+        ttl (float, optional): max age in seconds of live entries. Defaults to
+            CACHE_TTL.
+
+    Returns:
+        CachedResponse | None: cached response, or None if not cached, stale,
+            or recording/replaying
+    """
+    global _hits, _misses
+    if get_mode() != LIVE:
+        return None
+    paths = [get_entry_path(url, True)]
+    if not permanent:
+        paths.append(get_entry_path(url, False))
+    for i, path in enumerate(paths):
+        try:
+            if i > 0 and time.time() - os.path.getmtime(path) > ttl:
+                continue
+            with open(path, "rb") as fd:
+                content = fd.read()
+        except FileNotFoundError:
+            continue
+        with _lock:
+            _hits += 1
+        return CachedResponse(url, 200, content)
+    with _lock:
+        _misses += 1
+    return None
+
+
+def store(url: str, content: bytes, permanent: bool = False):
+    """Stores url's response body in cache.
+
+    Args:
+        url (str): request url, including query string
+        content (bytes): response body
+        permanent (bool, optional): if True, entry never expires. Defaults to
+            False.
+    """
+    if get_mode() != LIVE:
+        return
+    path = get_entry_path(url, permanent)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # write then rename, so readers never see a partial entry
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as fd:
+        fd.write(content)
+    os.replace(tmp_path, path)
+
+
+def get(
+    url: str,
+    permanent: bool = False,
+    ttl: float = CACHE_TTL,
+    session: requests.Session | None = None,
+    cacheable: Callable[[CachedResponse], bool] | None = None,
+    limiter: RateLimiter | None = None,
+    **kwargs,
+) -> CachedResponse:
+    """Gets url from cache, or fetches it with a GET request and caches it.
+
+    Only successful responses are cached.
+
+    Args:
+        url (str): request url, including query string
+        permanent (bool, optional): if True, response never changes, so it is
+            cached permanently. Defaults to False.
+        ttl (float, optional): seconds before a live response is refetched.
+            Defaults to CACHE_TTL.
+        session (requests.Session | None, optional): session to fetch with.
+            Defaults to None (requests.get).
+        cacheable (Callable[[CachedResponse], bool] | None, optional): if set,
+            fetched response is only cached if this returns True, ex. only if a
+            match is completed. Defaults to None.
+        limiter (RateLimiter | None, optional): rate limiter of url's host,
+            waited on before fetching from network. Defaults to None.
+        **kwargs: passed to requests.get
+
+    Returns:
+        CachedResponse: cached or fetched response
+    """
+    response = load(url, permanent, ttl)
+    if response is not None:
+        return response
+    if limiter is not None and get_mode() != REPLAY:
+        limiter.acquire()
+    response = fetch(url, session, **kwargs)
+    if response.ok and (cacheable is None or cacheable(response)):
+        store(url, response.content, permanent)
+    return response
+
+
+def get_stats() -> tuple[int, int]:
+    """Gets cache hits and misses since start of process or last reset.
+
+    Returns:
+        tuple[int, int]: (hits, misses)
+    """
+    with _lock:
+        return _hits, _misses
+
+
+def reset_stats():
+    """Resets cache hit and miss counts to zero."""
+    global _hits, _misses
+    with _lock:
+        _hits, _misses = 0, 0
+
+
+def format_stats() -> str:
+    """Formats cache hits and misses for logging.
+
+    Returns:
+        str: ex. "HTTP cache: 950 hits, 50 misses (95.0% hit rate)"
+    """
+    hits, misses = get_stats()
+    total = hits + misses
+    rate = f" ({100 * hits / total:.1f}% hit rate)" if total else ""
+    return f"HTTP cache: {hits} hits, {misses} misses{rate}"
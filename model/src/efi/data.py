@@ -1,12 +1,14 @@
 """
-Dataclass and enum definitions.
+Dataclass, enum, and rating window definitions.
 """
 
-from collections import deque
+from array import array
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
 from datetime import datetime, date
 from decimal import Decimal
 from enum import Enum
+from itertools import accumulate
 
 
 class IdType(Enum):
@@ -58,6 +60,98 @@ class MatchAlreadyInserted(Match):
     id: int
 
 
+class RatingWindow:
+    """Window of a club's 25 most recent offensive or defensive match
+    performances, most recent first.
+
+    Performances are kept in a fixed-size ring buffer alongside their running
+    sum and weighted sum (weights linearly decreasing from 1 for the most
+    recent performance), so pushing a performance and reading the rating are
+    both O(1). Sums are recomputed from the buffer once per full rotation to
+    keep floating point drift from accumulating.
+    """
+
+    SIZE = 25
+    STEP = 1 / SIZE  # weight lost by each performance per newer performance
+    WEIGHTS = tuple(1 - i / 25 for i in range(25))
+    NORMS = (0.0, *accumulate(WEIGHTS))  # NORMS[k] = sum(WEIGHTS[:k])
+
+    __slots__ = ("_values", "_head", "_len", "sum", "weighted_sum")
+
+    def __init__(self, values: Iterable[float] = ()):
+        """Creates window from performances ordered most recent first.
+
+        Args:
+            values (Iterable[float], optional): match performances, most recent
+                first; only the first SIZE are kept. Defaults to ().
+        """
+        self._values = array("d", bytes(8 * self.SIZE))
+        self._head = 0
+        self._len = 0
+        self.sum = 0.0
+        self.weighted_sum = 0.0
+        for v in reversed(list(values)[: self.SIZE]):
+            self.push(v)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[float]:
+        for i in range(self._len):
+            yield self._values[(self._head + i) % self.SIZE]
+
+    def __repr__(self) -> str:
+        return f"RatingWindow({list(self)})"
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, RatingWindow) and list(self) == list(other)
+
+    def push(self, mp: float):
+        """Adds newest match performance, evicting the oldest if full.
+
+        Args:
+            mp (float): match performance
+        """
+        evicted = 0.0
+        if self._len == self.SIZE:
+            evicted = self._values[(self._head - 1) % self.SIZE]
+        else:
+            self._len += 1
+        # every existing weight drops by STEP; the evicted performance's weight
+        # drops from STEP to 0, so it needs no separate correction
+        self.weighted_sum += mp - self.STEP * self.sum
+        self.sum += mp - evicted
+        self._head = (self._head - 1) % self.SIZE
+        self._values[self._head] = mp
+
+        if self._head == 0:
+            self.sum = 0.0
+            self.weighted_sum = 0.0
+            for i, v in enumerate(self):
+                self.sum += v
+                self.weighted_sum += v * self.WEIGHTS[i]
+
+    def copy(self) -> "RatingWindow":
+        window = RatingWindow()
+        window._values = array("d", self._values)
+        window._head = self._head
+        window._len = self._len
+        window.sum = self.sum
+        window.weighted_sum = self.weighted_sum
+        return window
+
+    @property
+    def rating(self) -> float:
+        """Weighted average of performances in window."""
+        return self.weighted_sum / self.NORMS[self._len]
+
+    @property
+    def shifted_weighted_sum(self) -> float:
+        """Weighted sum of performances after one more performance is pushed,
+        excluding the pushed performance itself."""
+        return self.weighted_sum - self.STEP * self.sum
+
+
 @dataclass
 class TableSnapshot:
     competition_id: int
@@ -81,8 +175,8 @@ class TableSnapshot:
 @dataclass
 class ClubSnapshot:
     name: str
-    mp_off: deque[float]
-    mp_def: deque[float]
+    mp_off: RatingWindow
+    mp_def: RatingWindow
     efi: list[float]
 
 
@@ -96,16 +190,18 @@ class SimTableSnapshot:
 
 @dataclass
 class SimClubSnapshot:
-    mp_off: deque[float]
-    mp_def: deque[float]
+    mp_off: RatingWindow
+    mp_def: RatingWindow
 
 
 @dataclass
 class SimResults:
     counts: list[int]
-    total_gd: int
-    total_pts: int
+    total_gd: float
+    total_pts: float
     simulations: int
+    std_error: float = 0.0  # max std error of position probabilities
+    pts_std_error: float = 0.0  # std error of avg pts
 
 
 @dataclass
@@ -145,6 +241,27 @@ class Competition:
     transfer_def_slope: float | None
 
 
+@dataclass
+class CompetitionParams:
+    avg_base: float
+    home_advantage: float
+    transfer_off_slope: float
+    transfer_def_slope: float
+    transfer_int: float
+
+
+@dataclass
+class BacktestSeason:
+    season: int
+    club_ids: list[int]
+    preseason_zs: dict[int, tuple[float, float]]  # club id -> (z_off, z_def)
+    # club id -> (avg_gs, avg_ga) in previous season; first season only
+    previous_avgs: dict[int, tuple[float, float]]
+    # completed matches in order of time:
+    # (club_id_1, club_id_2, comp_score_1, comp_score_2, score_1, score_2)
+    matches: list[tuple[int, int, float, float, int, int]]
+
+
 @dataclass
 class Club:
     id: int
@@ -180,3 +297,14 @@ class Performance:
     ign: float = 0.0
     bs: float = 0.0
     mp: int = 0
+
+
+@dataclass
+class RunCheckpoint:
+    competition_id: int
+    start: int
+    season: int  # next season to run
+    table_map: dict[int, TableSnapshot]  # club id -> table row at end of season
+    performance: Performance
+    sim_seed_entropy: int  # entropy of master seed of projection simulations
+    sim_seeds_spawned: int  # streams spawned from master seed so far
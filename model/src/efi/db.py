@@ -2,35 +2,189 @@
 Functions for interacting with DuckDB database.
 """
 
+import atexit
 import dataclasses
 import duckdb
-import numpy as np
+import os
 import pandas as pd
-from . import scoring
+import pyarrow as pa
+import threading
 from .data import (
     Match,
     TableSnapshot,
     Projection,
     SimClubSnapshot,
     MatchAlreadyInserted,
-    SimTableSnapshot,
     Competition,
     Club,
     TransferValue,
     Club_Competition,
     IdType,
+    RatingWindow,
 )
-from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
 from datetime import date
+from typing import TypeVar
 
 DB_FILE = "efi.db"
 
+_con: duckdb.DuckDBPyConnection | None = None  # connection shared by db functions
+_con_pid: int | None = None  # id of process that opened _con
+_lock = threading.RLock()  # serializes use of _con across threads
+_transaction_depth = 0  # number of nested transaction() blocks open
+
+T = TypeVar("T")  # dataclass type built by fetch_dataclasses
+
+# schema migrations, applied in order by migrate(); schema version is the number
+# applied so far, with version 0 being the tables and sequences made by create()
+MIGRATIONS = [
+    # 1: unique indexes for club lookups by external id. matches fotmob_id is
+    # left unindexed, since duckdb runs updates of indexed columns as delete +
+    # insert, which fails for matches referenced by history
+    """
+    CREATE UNIQUE INDEX clubs_official_id_idx ON clubs (official_id);
+    CREATE UNIQUE INDEX clubs_fotmob_id_idx ON clubs (fotmob_id);
+    CREATE UNIQUE INDEX clubs_fbref_id_idx ON clubs (fbref_id);
+    CREATE UNIQUE INDEX clubs_transfermarkt_id_idx ON clubs (transfermarkt_id);
+    """,
+    # 2: current state of each club per competition season, so reads don't need
+    # to aggregate over history and matches. Filled by rebuild_club_state
+    """
+    CREATE TABLE
+        club_state ( -- club's latest history row and match performance windows
+            competition_id INTEGER NOT NULL REFERENCES competitions (id),
+            season INTEGER NOT NULL,
+            club_id INTEGER NOT NULL REFERENCES clubs (id),
+            match_id INTEGER REFERENCES matches (id), -- NULL if preseason
+            off DOUBLE NOT NULL,
+            def DOUBLE NOT NULL,
+            efi DOUBLE NOT NULL,
+            mp INTEGER NOT NULL,
+            w INTEGER NOT NULL,
+            d INTEGER NOT NULL,
+            l INTEGER NOT NULL,
+            gf INTEGER NOT NULL,
+            ga INTEGER NOT NULL,
+            gd INTEGER NOT NULL,
+            pts INTEGER NOT NULL,
+            form VARCHAR[5] NOT NULL,
+            mp_off DOUBLE[] NOT NULL, -- 25 most recent, most recent first
+            mp_def DOUBLE[] NOT NULL, -- 25 most recent, most recent first
+        );
+    """,
+    # 3: history that club_state was last built from per competition season, so
+    # ensure_club_state can tell when history has changed since
+    """
+    CREATE TABLE
+        club_state_watermarks ( -- history rows club_state reflects
+            competition_id INTEGER NOT NULL REFERENCES competitions (id),
+            season INTEGER NOT NULL,
+            history_rows INTEGER NOT NULL,
+            history_max_id INTEGER, -- NULL if no history rows
+        );
+    """,
+]
+
+
+def get_connection() -> duckdb.DuckDBPyConnection:
+    """Gets connection shared by db functions, opening DB_FILE on first use.
+
+    The connection stays open until close() is called, so the database file and
+    catalog are only loaded once. While open, it holds DuckDB's lock on DB_FILE,
+    so other processes can't open the database; entry points such as
+    update.update_all and initialize.initialize_data close it once done. A
+    process forked after the connection was opened gets its own. Callers should
+    use connection() or transaction(), which serialize access across threads.
+
+    Returns:
+        duckdb.DuckDBPyConnection: shared connection
+    """
+    global _con, _con_pid
+    with _lock:
+        if _con is None or _con_pid != os.getpid():
+            _con = duckdb.connect(DB_FILE)
+            _con_pid = os.getpid()
+            atexit.register(close)
+        return _con
+
+
+def set_connection(con: duckdb.DuckDBPyConnection | None):
+    """Replaces connection shared by db functions.
+
+    Useful for tests, ex. set_connection(duckdb.connect(":memory:")). The
+    previous connection is closed.
+
+    Args:
+        con (duckdb.DuckDBPyConnection | None): connection to use, or None to
+            open DB_FILE again on next use
+    """
+    global _con, _con_pid
+    with _lock:
+        close()
+        if con is not None:
+            _con = con
+            _con_pid = os.getpid()
+
+
+def close():
+    """Closes connection shared by db functions, if open, releasing DB_FILE."""
+    global _con, _con_pid
+    with _lock:
+        if _con is not None and _con_pid == os.getpid():
+            atexit.unregister(close)
+            _con.close()
+        _con = None
+        _con_pid = None
+
+
+@contextmanager
+def connection() -> Iterator[duckdb.DuckDBPyConnection]:
+    """Context manager for exclusive use of shared connection by this thread.
+
+    Yields:
+        duckdb.DuckDBPyConnection: shared connection
+    """
+    with _lock:
+        yield get_connection()
+
+
+@contextmanager
+def transaction() -> Iterator[duckdb.DuckDBPyConnection]:
+    """Context manager running enclosed db calls in a single transaction.
+
+    Commits on exit, or rolls back if an exception is raised. Nested blocks join
+    the outermost transaction. Other threads wait until the transaction ends.
+
+    Yields:
+        duckdb.DuckDBPyConnection: shared connection
+    """
+    global _transaction_depth
+    with connection() as con:
+        if _transaction_depth:
+            _transaction_depth += 1
+            try:
+                yield con
+            finally:
+                _transaction_depth -= 1
+            return
 
-def create():
-    """Creates all db tables and sequences."""
-    with duckdb.connect(DB_FILE) as con:
         con.begin()
+        _transaction_depth = 1
+        try:
+            yield con
+        except BaseException:
+            con.rollback()
+            raise
+        else:
+            con.commit()
+        finally:
+            _transaction_depth = 0
 
+
+def create():
+    """Creates all db tables and sequences, then migrates schema to latest."""
+    with transaction() as con:
         con.execute(
             """
             CREATE SEQUENCE IF NOT EXISTS clubs_id_seq START 1;
@@ -164,10 +318,41 @@ def create():
                     avg_pts DOUBLE NOT NULL,
                     update_date DATE NOT NULL,
                 );
+
+            CREATE TABLE IF NOT EXISTS
+                schema_version (
+                    version INTEGER NOT NULL, -- number of MIGRATIONS applied
+                );
             """
         )
 
-        con.commit()
+    migrate()
+
+
+def get_schema_version() -> int:
+    """Gets number of MIGRATIONS applied to db.
+
+    Returns:
+        int: schema version, 0 if no migrations have been applied
+    """
+    with connection() as con:
+        results = con.execute("SELECT max(version) FROM schema_version").fetchall()
+    return results[0][0] or 0
+
+
+def migrate():
+    """Applies pending MIGRATIONS to db in a single transaction.
+
+    Existing db files can be upgraded in place by calling create(), which
+    creates any missing tables before migrating.
+    """
+    with transaction() as con:
+        version = get_schema_version()
+        for migration in MIGRATIONS[version:]:
+            con.execute(migration)
+        if version < len(MIGRATIONS):
+            con.execute("DELETE FROM schema_version")
+            con.execute("INSERT INTO schema_version VALUES (?)", [len(MIGRATIONS)])
 
 
 def initialize():
@@ -175,9 +360,7 @@ def initialize():
 
     Uses `data/clubs.csv` and `data/competitions.csv`.
     """
-    with duckdb.connect(DB_FILE) as con:
-        con.begin()
-
+    with transaction() as con:
         con.execute(
             """
             INSERT INTO clubs BY NAME
@@ -220,14 +403,10 @@ def initialize():
             """
         )
 
-        con.commit()
-
 
 def drop():
     """Drops all db tables and sequences."""
-    with duckdb.connect(DB_FILE) as con:
-        con.begin()
-
+    with transaction() as con:
         con.execute(
             """
             DROP SEQUENCE clubs_id_seq;
@@ -242,6 +421,9 @@ def drop():
 
         con.execute(
             """
+            DROP TABLE schema_version;
+            DROP TABLE club_state_watermarks;
+            DROP TABLE club_state;
             DROP TABLE projections;
             DROP TABLE history;
             DROP TABLE matches;
@@ -252,16 +434,14 @@ def drop():
             """
         )
 
-        con.commit()
-
 
 def clear():
     """Clears all db tables and resets sequences."""
-    with duckdb.connect(DB_FILE) as con:
-        con.begin()
-
+    with transaction() as con:
         con.execute(
             """
+            TRUNCATE club_state_watermarks;
+            TRUNCATE club_state;
             TRUNCATE projections;
             TRUNCATE history;
             TRUNCATE matches;
@@ -296,182 +476,250 @@ def clear():
             """
         )
 
-        con.commit()
-
 
-def dataclasses_to_dataframe(classes: list) -> pd.DataFrame:
-    """Converts list of dataclasses to dataframe.
+def dataclasses_to_table(classes: list) -> pa.Table:
+    """Converts list of dataclasses to Arrow table, column by column.
 
     Args:
-        classes (list): list of dataclasses of any type
+        classes (list): non-empty list of dataclasses of the same type
 
     Returns:
-        pd.DataFrame: dataframe with dataclass fields as column names
+        pa.Table: table with dataclass fields as column names
     """
-    return pd.DataFrame(
-        # note: astuple(obj) raises TypeError if obj is not a dataclass instance
-        [dataclasses.astuple(c) for c in classes],
-        columns=list([field.name for field in dataclasses.fields(classes[0])]),
+    return pa.table(
+        {
+            field.name: [getattr(c, field.name) for c in classes]
+            for field in dataclasses.fields(classes[0])
+        }
     )
 
 
+def fetch_dataclasses(result: duckdb.DuckDBPyConnection, cls: type[T]) -> list[T]:
+    """Converts rows of executed query to dataclasses.
+
+    Columns are matched to dataclass fields by name, and NULLs become None.
+
+    Args:
+        result (duckdb.DuckDBPyConnection): connection with executed query
+        cls (type[T]): dataclass type with a field for each result column
+
+    Returns:
+        list[T]: one dataclass per row
+    """
+    columns = [d[0] for d in result.description]  # type: ignore
+    return [cls(**dict(zip(columns, r))) for r in result.fetchall()]
+
+
 def get_competition_by_id(id: int) -> Competition | None:
-    with duckdb.connect(DB_FILE) as con:
-        results = con.execute(
-            """
-            SELECT *
-            FROM competitions
-            WHERE id = ?
-            """,
-            [id],
-        ).fetchall()
-    return Competition(*(results[0])) if results else None
+    with connection() as con:
+        results = fetch_dataclasses(
+            con.execute(
+                """
+                SELECT *
+                FROM competitions
+                WHERE id = ?
+                """,
+                [id],
+            ),
+            Competition,
+        )
+    return results[0] if results else None
 
 
 def get_clubs(competition_id: int, season: int) -> list[Club]:
-    with duckdb.connect(DB_FILE) as con:
-        results = con.execute(
-            """
-            SELECT c.*
-            FROM clubs c
-            JOIN clubs_competitions cc ON cc.club_id = c.id
-            WHERE cc.competition_id = ? AND cc.season = ?
-            """,
-            [competition_id, season],
-        ).fetchall()
-    return [Club(*r) for r in results]
+    with connection() as con:
+        results = fetch_dataclasses(
+            con.execute(
+                """
+                SELECT c.*
+                FROM clubs c
+                JOIN clubs_competitions cc ON cc.club_id = c.id
+                WHERE cc.competition_id = ? AND cc.season = ?
+                """,
+                [competition_id, season],
+            ),
+            Club,
+        )
+    return results
 
 
 def get_clubs_by_id_map(
     id: IdType, competition_id: int, season: int
 ) -> dict[str, Club]:
-    with duckdb.connect(DB_FILE) as con:
-        results = con.execute(
-            """
-            SELECT c.*
-            FROM clubs c
-            JOIN clubs_competitions cc ON cc.club_id = c.id
-            WHERE cc.competition_id = ? AND cc.season = ? 
-            """,
-            [competition_id, season],
-        ).fetchall()
-    return {r[id.value]: Club(*(r)) for r in results}
+    with connection() as con:
+        results = fetch_dataclasses(
+            con.execute(
+                """
+                SELECT c.*
+                FROM clubs c
+                JOIN clubs_competitions cc ON cc.club_id = c.id
+                WHERE cc.competition_id = ? AND cc.season = ? 
+                """,
+                [competition_id, season],
+            ),
+            Club,
+        )
+    key = dataclasses.fields(Club)[id.value].name
+    return {getattr(c, key): c for c in results}
 
 
 def get_club_by_fotmob_id(fotmob_id: str) -> Club | None:
-    with duckdb.connect(DB_FILE) as con:
-        results = con.execute(
-            """
-            SELECT *
-            FROM clubs
-            WHERE fotmob_id = ?
-            """,
-            [fotmob_id],
-        ).fetchall()
-    return Club(*(results[0])) if results else None
+    with connection() as con:
+        results = fetch_dataclasses(
+            con.execute(
+                """
+                SELECT *
+                FROM clubs
+                WHERE fotmob_id = ?
+                """,
+                [fotmob_id],
+            ),
+            Club,
+        )
+    return results[0] if results else None
 
 
 def get_club_by_fbref_id(fbref_id: str) -> Club | None:
-    with duckdb.connect(DB_FILE) as con:
-        results = con.execute(
-            """
-            SELECT *
-            FROM clubs
-            WHERE fbref_id = ?
-            """,
-            [fbref_id],
-        ).fetchall()
-    return Club(*(results[0])) if results else None
+    with connection() as con:
+        results = fetch_dataclasses(
+            con.execute(
+                """
+                SELECT *
+                FROM clubs
+                WHERE fbref_id = ?
+                """,
+                [fbref_id],
+            ),
+            Club,
+        )
+    return results[0] if results else None
 
 
 def get_club_by_official_id(official_id: str) -> Club | None:
-    with duckdb.connect(DB_FILE) as con:
-        results = con.execute(
-            """
-            SELECT *
-            FROM clubs
-            WHERE official_id = ?
-            """,
-            [official_id],
-        ).fetchall()
-    return Club(*(results[0])) if results else None
+    with connection() as con:
+        results = fetch_dataclasses(
+            con.execute(
+                """
+                SELECT *
+                FROM clubs
+                WHERE official_id = ?
+                """,
+                [official_id],
+            ),
+            Club,
+        )
+    return results[0] if results else None
 
 
 def get_club_by_transfermarkt_id(transfermarkt_id: str) -> Club | None:
-    with duckdb.connect(DB_FILE) as con:
-        results = con.execute(
-            """
-            SELECT *
-            FROM clubs
-            WHERE transfermarkt_id = ?
-            """,
-            [transfermarkt_id],
-        ).fetchall()
-    return Club(*(results[0])) if results else None
+    with connection() as con:
+        results = fetch_dataclasses(
+            con.execute(
+                """
+                SELECT *
+                FROM clubs
+                WHERE transfermarkt_id = ?
+                """,
+                [transfermarkt_id],
+            ),
+            Club,
+        )
+    return results[0] if results else None
 
 
 def get_match_by_fotmob_id(fotmob_id: str) -> MatchAlreadyInserted | None:
-    with duckdb.connect(DB_FILE) as con:
-        df = con.execute(
-            """
-            SELECT *
-            FROM matches
-            WHERE fotmob_id = ?
-            """,
-            [fotmob_id],
-        ).df()
-    results = df.replace({np.nan: None}).to_dict(orient="records")
-    return MatchAlreadyInserted(**results[0]) if results else None  # type: ignore
+    with connection() as con:
+        results = fetch_dataclasses(
+            con.execute(
+                """
+                SELECT *
+                FROM matches
+                WHERE fotmob_id = ?
+                """,
+                [fotmob_id],
+            ),
+            MatchAlreadyInserted,
+        )
+    return results[0] if results else None
+
+
+def get_matches_by_fotmob_ids(
+    fotmob_ids: list[str],
+) -> dict[str, MatchAlreadyInserted]:
+    """Gets matches with given FotMob ids in a single query.
+
+    Args:
+        fotmob_ids (list[str]): FotMob match ids
+
+    Returns:
+        dict[str, MatchAlreadyInserted]: FotMob id -> match, for ids in db
+    """
+    if not fotmob_ids:
+        return {}
+
+    with connection() as con:
+        results = fetch_dataclasses(
+            con.execute(
+                """
+                SELECT *
+                FROM matches
+                WHERE fotmob_id IN (SELECT unnest(?))
+                """,
+                [fotmob_ids],
+            ),
+            MatchAlreadyInserted,
+        )
+    return {m.fotmob_id: m for m in results}  # type: ignore - fotmob_id matched
 
 
 def get_matches(
     competition_id: int, season: int, completed: bool | None = None
 ) -> list[MatchAlreadyInserted]:
-    with duckdb.connect(DB_FILE) as con:
-        df = con.execute(
-            """
-            SELECT *
-            FROM matches
-            WHERE
-                competition_id = $competition_id AND
-                season = $season AND
-                ($completed IS NULL OR completed = $completed)
-            ORDER BY time
-            """,
-            {
-                "competition_id": competition_id,
-                "season": season,
-                "completed": completed,
-            },
-        ).df()
-    return [
-        MatchAlreadyInserted(**d)  # type: ignore
-        for d in df.replace({np.nan: None}).to_dict(orient="records")
-    ]
+    with connection() as con:
+        results = fetch_dataclasses(
+            con.execute(
+                """
+                SELECT *
+                FROM matches
+                WHERE
+                    competition_id = $competition_id AND
+                    season = $season AND
+                    ($completed IS NULL OR completed = $completed)
+                ORDER BY time
+                """,
+                {
+                    "competition_id": competition_id,
+                    "season": season,
+                    "completed": completed,
+                },
+            ),
+            MatchAlreadyInserted,
+        )
+    return results
 
 
 def get_matches_sim(
     competition_id: int, season: int, start_date: date
 ) -> list[MatchAlreadyInserted]:
-    with duckdb.connect(DB_FILE) as con:
-        df = con.execute(
-            """
-            SELECT *
-            FROM matches
-            WHERE competition_id = ? AND season = ? AND time >= ?
-            ORDER BY time
-            """,
-            [competition_id, season, start_date],
-        ).df()
-    return [
-        MatchAlreadyInserted(**d)  # type: ignore
-        for d in df.replace({np.nan: None}).to_dict(orient="records")
-    ]
+    with connection() as con:
+        results = fetch_dataclasses(
+            con.execute(
+                """
+                SELECT *
+                FROM matches
+                WHERE competition_id = ? AND season = ? AND time >= ?
+                ORDER BY time
+                """,
+                [competition_id, season, start_date],
+            ),
+            MatchAlreadyInserted,
+        )
+    return results
 
 
 def get_season_dates(competition_id: int, season: int) -> tuple[date, date]:
     """Gets dates of first and last match for given competition and season."""
-    with duckdb.connect(DB_FILE) as con:
+    with connection() as con:
         results = con.execute(
             """
             SELECT MIN(time), MAX(time)
@@ -491,7 +739,7 @@ def get_transfervalues_z(
     Returns:
         dict[int, tuple[float, float]]: club id -> (z_off, z_def)
     """
-    with duckdb.connect(DB_FILE) as con:
+    with connection() as con:
         results = con.execute(
             """
             SELECT
@@ -507,58 +755,48 @@ def get_transfervalues_z(
     return {r[0]: r[1:] for r in results}
 
 
-def get_history_latest_sim_table_snapshots(
+def get_history_latest_table_snapshots(
     competition_id: int, season: int
-) -> dict[int, SimTableSnapshot]:
-    with duckdb.connect(DB_FILE) as con:
-        results = con.execute(
-            """
-            SELECT DISTINCT ON (h.club_id) h.club_id, h.gf, h.gd, h.pts
-            FROM history h
-            LEFT JOIN matches m ON h.match_id = m.id
-            WHERE h.competition_id = ? AND h.season = ?
-            ORDER BY m.time DESC
-            """,
-            [competition_id, season],
-        ).fetchall()
-
-    return {r[0]: SimTableSnapshot(r[0], r[1], r[2], r[3]) for r in results}
+) -> dict[int, TableSnapshot]:
+    """Gets each club's latest table row in given competition/season.
 
+    Args:
+        competition_id (int): competition's db id, ex. 1 for Premier League
+        season (int): earlier year of season (ex. 2016 means 2016/17)
 
-def get_history_latest_table_snapshot(
-    club_id: int, competition_id: int, season: int
-) -> TableSnapshot:
-    with duckdb.connect(DB_FILE) as con:
-        df = con.execute(
-            """
-            SELECT
-                h.competition_id,
-                h.season,
-                h.club_id,
-                h.match_id,
-                h.off,
-                h.def AS def_,
-                h.efi,
-                h.form,
-                h.mp,
-                h.w,
-                h.d,
-                h.l,
-                h.gf,
-                h.ga,
-                h.gd,
-                h.pts
-            FROM history h
-            LEFT JOIN matches m ON h.match_id = m.id
-            WHERE h.club_id = ? AND h.competition_id = ? AND h.season = ?
-            ORDER BY m.time DESC
-            LIMIT 1
-            """,
-            [club_id, competition_id, season],
-        ).df()
-    d = df.to_dict(orient="records")[0]
-    d["form"] = d["form"].tolist()
-    return TableSnapshot(**d)  # type: ignore
+    Returns:
+        dict[int, TableSnapshot]: club id -> TableSnapshot
+    """
+    ensure_club_state(competition_id, season)
+    with connection() as con:
+        results = fetch_dataclasses(
+            con.execute(
+                """
+                SELECT
+                    competition_id,
+                    season,
+                    club_id,
+                    match_id,
+                    off,
+                    def AS def_,
+                    efi,
+                    form::VARCHAR[] AS form,
+                    mp,
+                    w,
+                    d,
+                    l,
+                    gf,
+                    ga,
+                    gd,
+                    pts
+                FROM club_state
+                WHERE competition_id = ? AND season = ?
+                """,
+                [competition_id, season],
+            ),
+            TableSnapshot,
+        )
+    return {t.club_id: t for t in results}
 
 
 def get_recent_match_performances(
@@ -578,13 +816,136 @@ def get_recent_match_performances(
     Returns:
         dict[int, SimClubSnapshot]: club id -> SimClubSnapshot
     """
-    with duckdb.connect(DB_FILE) as con:
+    ensure_club_state(competition_id, season)
+    with connection() as con:
+        results = con.execute(
+            """
+            SELECT club_id, mp_off[1:$n], mp_def[1:$n]
+            FROM club_state
+            WHERE competition_id = $competition_id AND season = $season
+            ORDER BY club_id
+            """,
+            {
+                "competition_id": competition_id,
+                "season": season,
+                "n": n,
+            },
+        ).fetchall()
+
+    return {
+        r[0]: SimClubSnapshot(mp_off=RatingWindow(r[1]), mp_def=RatingWindow(r[2]))
+        for r in results
+    }
+
+
+def ensure_club_state(competition_id: int, season: int):
+    """Rebuilds club_state for given competition/season if it is stale.
+
+    Staleness is checked with a plain read, so a transaction is only taken if a
+    rebuild is needed.
+
+    Args:
+        competition_id (int): competition's db id, ex. 1 for Premier League
+        season (int): earlier year of season (ex. 2016 means 2016/17)
+    """
+    if not is_club_state_stale(competition_id, season):
+        return
+    with transaction():
+        # another thread may have rebuilt it since
+        if is_club_state_stale(competition_id, season):
+            rebuild_club_state(competition_id, season)
+
+
+def is_club_state_stale(competition_id: int, season: int) -> bool:
+    """Checks whether history has changed since club_state was built for given
+    competition/season.
+
+    History is compared by row count and max id against the watermark stored
+    when club_state was built. upsert_history replaces rows with new ids, so
+    any upsert or deletion changes it. In-place UPDATEs of history rows are not
+    detected; call rebuild_club_state after them.
+
+    Args:
+        competition_id (int): competition's db id, ex. 1 for Premier League
+        season (int): earlier year of season (ex. 2016 means 2016/17)
+
+    Returns:
+        bool: True if club_state was never built or history has changed
+    """
+    with connection() as con:
         results = con.execute(
             """
-            -- Get n latest match performances within competition/season per club,
-            -- including initial ratings at beginning of season.
+            SELECT
+                w.season IS NULL OR
+                w.history_rows != h.history_rows OR
+                w.history_max_id IS DISTINCT FROM h.history_max_id
+            FROM (
+                SELECT count(*) AS history_rows, max(id) AS history_max_id
+                FROM history
+                WHERE competition_id = $competition_id AND season = $season
+            ) h
+            LEFT JOIN club_state_watermarks w
+            ON w.competition_id = $competition_id AND w.season = $season
+            """,
+            {"competition_id": competition_id, "season": season},
+        ).fetchall()
+    return results[0][0]
+
+
+def update_club_state_watermark(competition_id: int, season: int):
+    """Records current history of given competition/season as reflected in
+    club_state.
+
+    Args:
+        competition_id (int): competition's db id, ex. 1 for Premier League
+        season (int): earlier year of season (ex. 2016 means 2016/17)
+    """
+    with transaction() as con:
+        con.execute(
+            """
+            DELETE FROM club_state_watermarks
+            WHERE competition_id = $competition_id AND season = $season
+            """,
+            {"competition_id": competition_id, "season": season},
+        )
+
+        con.execute(
+            """
+            INSERT INTO club_state_watermarks
+            SELECT $competition_id, $season, count(*), max(id)
+            FROM history
+            WHERE competition_id = $competition_id AND season = $season
+            """,
+            {"competition_id": competition_id, "season": season},
+        )
+
+
+def rebuild_club_state(competition_id: int, season: int):
+    """Rebuilds club_state for given competition/season from history and matches.
+
+    Each club's state is its latest history row, with its 25 most recent match
+    performances, including initial off/def ratings at beginning of season.
+
+    Args:
+        competition_id (int): competition's db id, ex. 1 for Premier League
+        season (int): earlier year of season (ex. 2016 means 2016/17)
+    """
+    with transaction() as con:
+        con.execute(
+            """
+            DELETE FROM club_state
+            WHERE competition_id = ? AND season = ?
+            """,
+            [competition_id, season],
+        )
+
+        con.execute(
+            """
+            -- Get 25 latest match performances within competition/season per
+            -- club, including initial ratings at beginning of season.
+            INSERT INTO club_state BY NAME
             WITH cte AS (
-            	SELECT NULL as time, club_id, off AS mp_off, def AS mp_def
+                SELECT NULL as time, club_id, off AS mp_off, def AS mp_def
                 FROM history
                 WHERE competition_id = $competition_id AND season = $season AND match_id IS NULL
                 UNION
@@ -596,7 +957,7 @@ def get_recent_match_performances(
                     completed = TRUE AND
                     mp_off_1 IS NOT NULL AND
                     mp_def_1 IS NOT NULL
-                UNION 
+                UNION
                 SELECT time, club_id_2 AS club_id, mp_off_2 AS mp_off, mp_def_2 AS mp_def
                 FROM matches
                 WHERE
@@ -605,68 +966,120 @@ def get_recent_match_performances(
                     completed = TRUE AND
                     mp_off_2 IS NOT NULL AND
                     mp_def_2 IS NOT NULL
+            ),
+            windows AS (
+                SELECT
+                    club_id,
+                    array_agg(mp_off ORDER BY time DESC)[1:25] AS mp_off,
+                    array_agg(mp_def ORDER BY time DESC)[1:25] AS mp_def
+                FROM cte
+                GROUP BY club_id
+            ),
+            latest AS (
+                SELECT DISTINCT ON (h.club_id) h.* EXCLUDE (id)
+                FROM history h
+                LEFT JOIN matches m ON h.match_id = m.id
+                WHERE h.competition_id = $competition_id AND h.season = $season
+                ORDER BY h.club_id, m.time DESC
             )
-            SELECT
-                club_id,
-                array_agg(mp_off ORDER BY time DESC)[1:$n] AS mp_off,
-                array_agg(mp_def ORDER BY time DESC)[1:$n] AS mp_def
-            FROM cte
-            GROUP BY club_id
-            ORDER BY club_id
+            SELECT *
+            FROM latest
+            JOIN windows USING (club_id)
             """,
-            {
-                "competition_id": competition_id,
-                "season": season,
-                "n": n,
-            },
-        ).fetchall()
+            {"competition_id": competition_id, "season": season},
+        )
+
+        update_club_state_watermark(competition_id, season)
 
-    return {
-        r[0]: SimClubSnapshot(mp_off=deque(r[1], n), mp_def=deque(r[2], n))
-        for r in results
-    }
+
+def upsert_club_state(
+    values: list[TableSnapshot], clubs_map: dict[int, SimClubSnapshot]
+):
+    """Replaces clubs' rows in club_state.
+
+    Should be called with the history rows just upserted, in the same
+    transaction, since the watermark of their competition/season is updated to
+    current history.
+
+    Args:
+        values (list[TableSnapshot]): clubs' latest history rows
+        clubs_map (dict[int, SimClubSnapshot]): club id -> match performances,
+            including those of each club's latest match
+    """
+    if not values:
+        return
+
+    tbl = dataclasses_to_table(values)
+    tbl = tbl.rename_columns(["def" if c == "def_" else c for c in tbl.column_names])
+    tbl = tbl.append_column(
+        "mp_off", pa.array([list(clubs_map[t.club_id].mp_off) for t in values])
+    )
+    tbl = tbl.append_column(
+        "mp_def", pa.array([list(clubs_map[t.club_id].mp_def) for t in values])
+    )
+
+    with transaction() as con:
+        con.execute(
+            """
+            DELETE FROM club_state USING tbl
+            WHERE
+                club_state.competition_id = tbl.competition_id AND
+                club_state.season = tbl.season AND
+                club_state.club_id = tbl.club_id
+            """
+        )
+
+        con.execute(
+            """
+            INSERT INTO club_state BY NAME
+            SELECT * FROM tbl
+            """
+        )
+
+        for competition_id, season in {(t.competition_id, t.season) for t in values}:
+            update_club_state_watermark(competition_id, season)
 
 
 def get_matches_for_predictions(
     competition_id: int, season: int
 ) -> list[MatchAlreadyInserted]:
-    with duckdb.connect(DB_FILE) as con:
-        df = con.execute(
-            """
-            -- get all matches where both clubs do not have an earlier incomplete match
-            -- i.e., get all matches where the match is the earliest next match for both clubs
-            WITH upcoming AS (
-                SELECT club_id_1 AS club_id, time
-                FROM matches
-                WHERE completed = FALSE AND competition_id = $competition_id AND season = $season 
-                UNION
-                SELECT club_id_2 AS club_id, time
-                FROM matches
-                WHERE completed = FALSE AND competition_id = $competition_id AND season = $season
-            ), next_per_club AS (
-                SELECT DISTINCT ON (club_id) club_id, time
-                FROM upcoming
-                ORDER BY time
-            )
-            SELECT m.*
-            FROM matches m
-            JOIN next_per_club n1 ON m.club_id_1 = n1.club_id AND n1.time = m.time
-            JOIN next_per_club n2 ON m.club_id_2 = n2.club_id AND n2.time = m.time
-            ORDER BY m.time, m.id
-            """,
-            {
-                "competition_id": competition_id,
-                "season": season,
-            },
-        ).df()
-    return [
-        MatchAlreadyInserted(**d)  # type: ignore
-        for d in df.replace({np.nan: None}).to_dict(orient="records")
-    ]
+    with connection() as con:
+        results = fetch_dataclasses(
+            con.execute(
+                """
+                -- get all matches where both clubs do not have an earlier incomplete match
+                -- i.e., get all matches where the match is the earliest next match for both clubs
+                WITH upcoming AS (
+                    SELECT club_id_1 AS club_id, time
+                    FROM matches
+                    WHERE completed = FALSE AND competition_id = $competition_id AND season = $season 
+                    UNION
+                    SELECT club_id_2 AS club_id, time
+                    FROM matches
+                    WHERE completed = FALSE AND competition_id = $competition_id AND season = $season
+                ), next_per_club AS (
+                    SELECT DISTINCT ON (club_id) club_id, time
+                    FROM upcoming
+                    ORDER BY time
+                )
+                SELECT m.*
+                FROM matches m
+                JOIN next_per_club n1 ON m.club_id_1 = n1.club_id AND n1.time = m.time
+                JOIN next_per_club n2 ON m.club_id_2 = n2.club_id AND n2.time = m.time
+                ORDER BY m.time, m.id
+                """,
+                {
+                    "competition_id": competition_id,
+                    "season": season,
+                },
+            ),
+            MatchAlreadyInserted,
+        )
+    return results
 
 
 def get_mongo_tables(competition_id: int, season: int | None = None) -> pd.DataFrame:
-    with duckdb.connect(DB_FILE) as con:
+    with connection() as con:
         df = con.execute(
             """
             WITH cte AS (
@@ -715,7 +1128,7 @@ def get_mongo_tables(competition_id: int, season: int | None = None) -> pd.DataF
 def get_mongo_matchweek_counts(
     competition_id: int, season: int | None = None
 ) -> pd.DataFrame:
-    with duckdb.connect(DB_FILE) as con:
+    with connection() as con:
         df = con.execute(
             """
             SELECT
@@ -733,7 +1146,7 @@ def get_mongo_matchweek_counts(
 
 
 def get_mongo_scores(competition_id: int, season: int | None = None) -> pd.DataFrame:
-    with duckdb.connect(DB_FILE) as con:
+    with connection() as con:
         df = con.execute(
             """
             SELECT
@@ -767,7 +1180,7 @@ def get_mongo_scores(competition_id: int, season: int | None = None) -> pd.DataF
 
 
 def get_mongo_latest_table_info(competition_id: int) -> pd.DataFrame:
-    with duckdb.connect(DB_FILE) as con:
+    with connection() as con:
         df = con.execute(
             """
             SELECT season, matchweek
@@ -782,7 +1195,7 @@ def get_mongo_latest_table_info(competition_id: int) -> pd.DataFrame:
 
 
 def get_mongo_latest_scores_info(competition_id: int) -> pd.DataFrame:
-    with duckdb.connect(DB_FILE) as con:
+    with connection() as con:
         df = con.execute(
             """
             SELECT season, display_with_matchweek AS matchweek
@@ -797,7 +1210,7 @@ def get_mongo_latest_scores_info(competition_id: int) -> pd.DataFrame:
 
 
 def get_mongo_latest_trends(competition_id: int, season: int) -> pd.DataFrame:
-    with duckdb.connect(DB_FILE) as con:
+    with connection() as con:
         df = con.execute(
             """
             -- Get clubs with largest increase and decrease in EFI over
@@ -836,7 +1249,7 @@ def get_mongo_latest_trends(competition_id: int, season: int) -> pd.DataFrame:
 
 
 def get_mongo_competition_seasons(competition_id: int) -> pd.DataFrame:
-    with duckdb.connect(DB_FILE) as con:
+    with connection() as con:
         df = con.execute(
             """
             SELECT season, COUNT(DISTINCT matchweek) AS matchweeks
@@ -854,12 +1267,12 @@ def insert_transfervalues(values: list[TransferValue]):
     if not values:
         return
 
-    df = dataclasses_to_dataframe(values)
-    with duckdb.connect(DB_FILE) as con:
+    tbl = dataclasses_to_table(values)
+    with connection() as con:
         con.execute(
             """
             INSERT INTO transfervalues BY NAME
-            SELECT * FROM df
+            SELECT * FROM tbl
             """
         )
 
@@ -868,12 +1281,12 @@ def insert_clubs_competitions(values: list[Club_Competition]):
     if not values:
         return
 
-    df = dataclasses_to_dataframe(values)
-    with duckdb.connect(DB_FILE) as con:
+    tbl = dataclasses_to_table(values)
+    with connection() as con:
         con.execute(
             """
             INSERT INTO clubs_competitions BY NAME
-            SELECT * FROM df
+            SELECT * FROM tbl
             """
         )
 
@@ -882,12 +1295,12 @@ def insert_matches(values: list[Match]):
     if not values:
         return
 
-    df = dataclasses_to_dataframe(values)
-    with duckdb.connect(DB_FILE) as con:
+    tbl = dataclasses_to_table(values)
+    with connection() as con:
         con.execute(
             """
             INSERT INTO matches BY NAME
-            SELECT * FROM df
+            SELECT * FROM tbl
             """
         )
 
@@ -896,18 +1309,18 @@ def update_matches_time(values: list[Match]):
     if not values:
         return
 
-    df = dataclasses_to_dataframe(values)
-    with duckdb.connect(DB_FILE) as con:
+    tbl = dataclasses_to_table(values)
+    with connection() as con:
         con.execute(
             """
-            UPDATE matches m SET time = df.time
-            FROM df
+            UPDATE matches m SET time = tbl.time
+            FROM tbl
             WHERE
-                m.competition_id = df.competition_id AND
-                m.season = df.season AND
-                m.matchweek = df.matchweek AND
-                m.club_id_1 = df.club_id_1 AND
-                m.club_id_2 = df.club_id_2
+                m.competition_id = tbl.competition_id AND
+                m.season = tbl.season AND
+                m.matchweek = tbl.matchweek AND
+                m.club_id_1 = tbl.club_id_1 AND
+                m.club_id_2 = tbl.club_id_2
 
             """
         )
@@ -917,18 +1330,18 @@ def update_matches_fotmob_id(values: list[Match]):
     if not values:
         return
 
-    df = dataclasses_to_dataframe(values)
-    with duckdb.connect(DB_FILE) as con:
+    tbl = dataclasses_to_table(values)
+    with connection() as con:
         con.execute(
             """
-            UPDATE matches m SET fotmob_id = df.fotmob_id
-            FROM df
+            UPDATE matches m SET fotmob_id = tbl.fotmob_id
+            FROM tbl
             WHERE
-                m.competition_id = df.competition_id AND
-                m.season = df.season AND
-                m.matchweek = df.matchweek AND
-                m.club_id_1 = df.club_id_1 AND
-                m.club_id_2 = df.club_id_2
+                m.competition_id = tbl.competition_id AND
+                m.season = tbl.season AND
+                m.matchweek = tbl.matchweek AND
+                m.club_id_1 = tbl.club_id_1 AND
+                m.club_id_2 = tbl.club_id_2
             """
         )
 
@@ -937,18 +1350,18 @@ def update_matches_display_matchweek(values: list[Match]):
     if not values:
         return
 
-    df = dataclasses_to_dataframe(values)
-    with duckdb.connect(DB_FILE) as con:
+    tbl = dataclasses_to_table(values)
+    with connection() as con:
         con.execute(
             """
-            UPDATE matches m SET display_with_matchweek = df.display_with_matchweek
-            FROM df
+            UPDATE matches m SET display_with_matchweek = tbl.display_with_matchweek
+            FROM tbl
             WHERE
-                m.competition_id = df.competition_id AND
-                m.season = df.season AND
-                m.matchweek = df.matchweek AND
-                m.club_id_1 = df.club_id_1 AND
-                m.club_id_2 = df.club_id_2
+                m.competition_id = tbl.competition_id AND
+                m.season = tbl.season AND
+                m.matchweek = tbl.matchweek AND
+                m.club_id_1 = tbl.club_id_1 AND
+                m.club_id_2 = tbl.club_id_2
             """
         )
 
@@ -957,24 +1370,24 @@ def update_matches_network(values: list[Match]):
     if not values:
         return
 
-    df = dataclasses_to_dataframe(values)
-    with duckdb.connect(DB_FILE) as con:
+    tbl = dataclasses_to_table(values)
+    with connection() as con:
         con.execute(
             """
-            UPDATE matches m SET network = df.network
-            FROM df
+            UPDATE matches m SET network = tbl.network
+            FROM tbl
             WHERE
-                m.competition_id = df.competition_id AND
-                m.season = df.season AND
+                m.competition_id = tbl.competition_id AND
+                m.season = tbl.season AND
                 (
-                    m.matchweek = df.matchweek OR
+                    m.matchweek = tbl.matchweek OR
                     (
                         m.display_with_matchweek IS NOT NULL AND
-                        m.display_with_matchweek = df.matchweek
+                        m.display_with_matchweek = tbl.matchweek
                     )
                 ) AND
-                m.club_id_1 = df.club_id_1 AND
-                m.club_id_2 = df.club_id_2
+                m.club_id_1 = tbl.club_id_1 AND
+                m.club_id_2 = tbl.club_id_2
             """
         )
 
@@ -983,28 +1396,28 @@ def update_matches_predictions(values: list[Match]):
     if not values:
         return
 
-    df = dataclasses_to_dataframe(values)
-    with duckdb.connect(DB_FILE) as con:
+    tbl = dataclasses_to_table(values)
+    with connection() as con:
         con.execute(
             """
             UPDATE matches m
             SET
-                off_1 = df.off_1,
-                def_1 = df.def_1,
-                efi_1 = df.efi_1,
-                off_2 = df.off_2,
-                def_2 = df.def_2,
-                efi_2 = df.efi_2,
-                prob_1 = df.prob_1,
-                prob_2 = df.prob_2,
-                prob_d = df.prob_d
-            FROM df
+                off_1 = tbl.off_1,
+                def_1 = tbl.def_1,
+                efi_1 = tbl.efi_1,
+                off_2 = tbl.off_2,
+                def_2 = tbl.def_2,
+                efi_2 = tbl.efi_2,
+                prob_1 = tbl.prob_1,
+                prob_2 = tbl.prob_2,
+                prob_d = tbl.prob_d
+            FROM tbl
             WHERE
-                m.competition_id = df.competition_id AND
-                m.season = df.season AND
-                m.matchweek = df.matchweek AND
-                m.club_id_1 = df.club_id_1 AND
-                m.club_id_2 = df.club_id_2
+                m.competition_id = tbl.competition_id AND
+                m.season = tbl.season AND
+                m.matchweek = tbl.matchweek AND
+                m.club_id_1 = tbl.club_id_1 AND
+                m.club_id_2 = tbl.club_id_2
             """
         )
 
@@ -1013,24 +1426,24 @@ def update_matches_performances(values: list[Match]):
     if not values:
         return
 
-    df = dataclasses_to_dataframe(values)
-    with duckdb.connect(DB_FILE) as con:
+    tbl = dataclasses_to_table(values)
+    with connection() as con:
         con.execute(
             """
             UPDATE matches m
             SET
-                completed = df.completed,
-                mp_off_1 = df.mp_off_1,
-                mp_def_1 = df.mp_def_1,
-                mp_off_2 = df.mp_off_2,
-                mp_def_2 = df.mp_def_2
-            FROM df
+                completed = tbl.completed,
+                mp_off_1 = tbl.mp_off_1,
+                mp_def_1 = tbl.mp_def_1,
+                mp_off_2 = tbl.mp_off_2,
+                mp_def_2 = tbl.mp_def_2
+            FROM tbl
             WHERE
-                m.competition_id = df.competition_id AND
-                m.season = df.season AND
-                m.matchweek = df.matchweek AND
-                m.club_id_1 = df.club_id_1 AND
-                m.club_id_2 = df.club_id_2
+                m.competition_id = tbl.competition_id AND
+                m.season = tbl.season AND
+                m.matchweek = tbl.matchweek AND
+                m.club_id_1 = tbl.club_id_1 AND
+                m.club_id_2 = tbl.club_id_2
             """
         )
 
@@ -1039,27 +1452,27 @@ def update_matches_stats(values: list[Match]):
     if not values:
         return
 
-    df = dataclasses_to_dataframe(values)
-    with duckdb.connect(DB_FILE) as con:
+    tbl = dataclasses_to_table(values)
+    with connection() as con:
         con.execute(
             """
             UPDATE matches m
             SET
-                completed = df.completed,
-                score_1 = df.score_1,
-                score_2 = df.score_2,
-                xg_1 = df.xg_1,
-                xg_2 = df.xg_2,
-                ag_1 = df.ag_1,
-                ag_2 = df.ag_2,
-                events = df.events
-            FROM df
+                completed = tbl.completed,
+                score_1 = tbl.score_1,
+                score_2 = tbl.score_2,
+                xg_1 = tbl.xg_1,
+                xg_2 = tbl.xg_2,
+                ag_1 = tbl.ag_1,
+                ag_2 = tbl.ag_2,
+                events = tbl.events
+            FROM tbl
             WHERE
-                m.competition_id = df.competition_id AND
-                m.season = df.season AND
-                m.matchweek = df.matchweek AND
-                m.club_id_1 = df.club_id_1 AND
-                m.club_id_2 = df.club_id_2
+                m.competition_id = tbl.competition_id AND
+                m.season = tbl.season AND
+                m.matchweek = tbl.matchweek AND
+                m.club_id_1 = tbl.club_id_1 AND
+                m.club_id_2 = tbl.club_id_2
             """
         )
 
@@ -1068,25 +1481,25 @@ def upsert_history(values: list[TableSnapshot]):
     if not values:
         return
 
-    df = dataclasses_to_dataframe(values)
-    df.rename(columns={"def_": "def"}, inplace=True)
+    tbl = dataclasses_to_table(values)
+    tbl = tbl.rename_columns(["def" if c == "def_" else c for c in tbl.column_names])
 
-    with duckdb.connect(DB_FILE) as con:
+    with connection() as con:
         con.execute(
             """
-            DELETE FROM history USING df
+            DELETE FROM history USING tbl
             WHERE
-                history.competition_id = df.competition_id AND
-                history.season = df.season AND
-                history.club_id = df.club_id AND
-                history.match_id = df.match_id
+                history.competition_id = tbl.competition_id AND
+                history.season = tbl.season AND
+                history.club_id = tbl.club_id AND
+                history.match_id = tbl.match_id
             """
         )
 
         con.execute(
             """
             INSERT INTO history BY NAME
-            SELECT * FROM df
+            SELECT * FROM tbl
             """
         )
 
@@ -1095,33 +1508,34 @@ def upsert_projections(values: list[Projection]):
     if not values:
         return
 
-    df = dataclasses_to_dataframe(values)
-    with duckdb.connect(DB_FILE) as con:
+    tbl = dataclasses_to_table(values)
+    with connection() as con:
         con.execute(
             """
-            DELETE FROM projections USING df
+            DELETE FROM projections USING tbl
             WHERE
-                projections.club_id = df.club_id AND
-                projections.competition_id = df.competition_id AND
-                projections.season = df.season AND
-                projections.matchweek = df.matchweek
+                projections.club_id = tbl.club_id AND
+                projections.competition_id = tbl.competition_id AND
+                projections.season = tbl.season AND
+                projections.matchweek = tbl.matchweek
             """
         )
 
         con.execute(
             """
             INSERT INTO projections BY NAME
-            SELECT * FROM df
+            SELECT * FROM tbl
         """
         )
 
 
-def evaluate_rps(
+def evaluate(
     competition_id: int | None = None, start: int | None = None, end: int | None = None
 ) -> pd.DataFrame:
-    """Evaluates model using RPS over given competition and seasons.
+    """Evaluates model using RPS, IGN, and BS over given competition and seasons.
 
-    RPS: ranked probability score. See README.md for details.
+    All three scores are computed with native SQL in a single scan of matches.
+    See README.md for details on each score.
 
     Args:
         competition_id (int | None, optional): restrict evaluation to a single
@@ -1135,32 +1549,46 @@ def evaluate_rps(
             season per competition. Defaults to None.
 
     Returns:
-        pd.DataFrame: dataframe with average RPS, standard deviation, median,
-            and number of matches the model was evaluated over.
+        pd.DataFrame: dataframe with average, standard deviation, and median of
+            each score, and number of matches the model was evaluated over.
+            First row is overall (competition_id and season NULL), followed by
+            a row per competition (season NULL) and per competition/season.
     """
-    with duckdb.connect(DB_FILE) as con:
-        con.create_function("compute_rps", scoring.compute_rps)
+    with connection() as con:
         df = con.execute(
             """
-            SELECT avg(rps) AS avg_rps, stddev(rps) AS sd_rps, median(rps) AS med_rps, COUNT(*) AS count
-            FROM (
-                SELECT season, time, prob_1, prob_d, prob_2, score_1, score_2,
-                    compute_rps(
-                        array_value(prob_1, prob_d, prob_2),
-                        array_value(
-                            CASE WHEN score_1 > score_2 THEN 1 ELSE 0 END, 
-                            CASE WHEN score_1 = score_2 THEN 1 ELSE 0 END, 
-                            CASE WHEN score_1 < score_2 THEN 1 ELSE 0 END
-                        )
-                    ) as rps
+            WITH outcomes AS (
+                SELECT
+                    competition_id, season, prob_1, prob_d, prob_2,
+                    CASE WHEN score_1 > score_2 THEN 1 ELSE 0 END AS o_1,
+                    CASE WHEN score_1 = score_2 THEN 1 ELSE 0 END AS o_d,
+                    CASE WHEN score_1 < score_2 THEN 1 ELSE 0 END AS o_2
                 FROM matches
                 WHERE
                     prob_1 IS NOT NULL AND prob_d IS NOT NULL AND prob_2 IS NOT NULL AND score_1 IS NOT NULL AND score_2 IS NOT NULL AND
                     ($competition_id IS NULL OR competition_id = $competition_id) AND
                     ($start IS NULL OR season >= $start) AND
                     ($end IS NULL OR season < $end)
-                ORDER BY time
+            ), scores AS (
+                SELECT
+                    competition_id,
+                    season,
+                    -- cumulative differences over [1, d, 2]; the last is always 0
+                    (pow(prob_1 - o_1, 2) + pow(prob_1 + prob_d - o_1 - o_d, 2)) / 2 AS rps,
+                    -log2(o_1 * prob_1 + o_d * prob_d + o_2 * prob_2) AS ign,
+                    pow(prob_1 - o_1, 2) + pow(prob_d - o_d, 2) + pow(prob_2 - o_2, 2) AS bs
+                FROM outcomes
             )
+            SELECT
+                competition_id,
+                season,
+                avg(rps) AS avg_rps, stddev(rps) AS sd_rps, median(rps) AS med_rps,
+                avg(ign) AS avg_ign, stddev(ign) AS sd_ign, median(ign) AS med_ign,
+                avg(bs) AS avg_bs, stddev(bs) AS sd_bs, median(bs) AS med_bs,
+                COUNT(*) AS count
+            FROM scores
+            GROUP BY GROUPING SETS ((), (competition_id), (competition_id, season))
+            ORDER BY competition_id NULLS FIRST, season NULLS FIRST
             """,
             {"competition_id": competition_id, "start": start, "end": end},
         ).df()
@@ -1168,6 +1596,35 @@ def evaluate_rps(
     return df
 
 
+def evaluate_rps(
+    competition_id: int | None = None, start: int | None = None, end: int | None = None
+) -> pd.DataFrame:
+    """Evaluates model using RPS over given competition and seasons.
+
+    RPS: ranked probability score. See README.md for details.
+
+    Args:
+        competition_id (int | None, optional): restrict evaluation to a single
+            competition using competition's db id, ex. 1 for Premier League. If
+            None, evaluates model over all competitions. Defaults to None.
+        start (int | None, optional): earlier year of first season to include in
+            evaluation (ex. 2016 means 2016/17). If None, starts from earliest
+            possible season per competition. Defaults to None.
+        end (int | None, optional): later year of final season to include in
+            evaluation (ex. 2025 means 2024/25). If None, ends at most recent
+            season per competition. Defaults to None.
+
+    Returns:
+        pd.DataFrame: dataframe with average RPS, standard deviation, median,
+            and number of matches the model was evaluated over.
+    """
+    df = evaluate(competition_id, start, end)
+    return df.loc[
+        df["competition_id"].isna() & df["season"].isna(),
+        ["avg_rps", "sd_rps", "med_rps", "count"],
+    ].reset_index(drop=True)
+
+
 def evaluate_ign(
     competition_id: int | None = None, start: int | None = None, end: int | None = None
 ) -> pd.DataFrame:
@@ -1190,32 +1647,11 @@ def evaluate_ign(
         pd.DataFrame: dataframe with average IGN, standard deviation, median,
             and number of matches the model was evaluated over.
     """
-    with duckdb.connect(DB_FILE) as con:
-        df = con.execute(
-            """
-            SELECT avg(ign) AS avg_ign, stddev(ign) AS sd_ign, median(ign) AS med_ign, COUNT(*) AS count
-            FROM (
-                SELECT season, time, prob_1, prob_d, prob_2, score_1, score_2,
-                    -log2(
-                        CASE
-                            WHEN score_1 > score_2 THEN prob_1
-                            WHEN score_1 = score_2 THEN prob_d
-                            ELSE prob_2
-                        END
-                    ) as ign
-                FROM matches
-                WHERE
-                    prob_1 IS NOT NULL AND prob_d IS NOT NULL AND prob_2 IS NOT NULL AND score_1 IS NOT NULL AND score_2 IS NOT NULL AND
-                    ($competition_id IS NULL OR competition_id = $competition_id) AND
-                    ($start IS NULL OR season >= $start) AND
-                    ($end IS NULL OR season < $end)
-                ORDER BY time
-            )
-            """,
-            {"competition_id": competition_id, "start": start, "end": end},
-        ).df()
-
-    return df
+    df = evaluate(competition_id, start, end)
+    return df.loc[
+        df["competition_id"].isna() & df["season"].isna(),
+        ["avg_ign", "sd_ign", "med_ign", "count"],
+    ].reset_index(drop=True)
 
 
 def evaluate_bs(
@@ -1240,34 +1676,11 @@ def evaluate_bs(
         pd.DataFrame: dataframe with average BS, standard deviation, median,
             and number of matches the model was evaluated over.
     """
-    with duckdb.connect(DB_FILE) as con:
-        con.create_function("compute_bs", scoring.compute_bs)
-        df = con.execute(
-            """
-            SELECT avg(bs) AS avg_bs, stddev(bs) AS sd_bs, median(bs) AS med_bs, COUNT(*) AS count
-            FROM (
-                SELECT season, time, prob_1, prob_d, prob_2, score_1, score_2,
-                    compute_bs(
-                        array_value(prob_1, prob_d, prob_2),
-                        array_value(
-                            CASE WHEN score_1 > score_2 THEN 1 ELSE 0 END,
-                            CASE WHEN score_1 = score_2 THEN 1 ELSE 0 END,
-                            CASE WHEN score_1 < score_2 THEN 1 ELSE 0 END
-                        )
-                    ) as bs
-                FROM matches
-                WHERE
-                    prob_1 IS NOT NULL AND prob_d IS NOT NULL AND prob_2 IS NOT NULL AND score_1 IS NOT NULL AND score_2 IS NOT NULL AND
-                    ($competition_id IS NULL OR competition_id = $competition_id) AND
-                    ($start IS NULL OR season >= $start) AND
-                    ($end IS NULL OR season < $end)
-                ORDER BY time
-            )
-            """,
-            {"competition_id": competition_id, "start": start, "end": end},
-        ).df()
-
-    return df
+    df = evaluate(competition_id, start, end)
+    return df.loc[
+        df["competition_id"].isna() & df["season"].isna(),
+        ["avg_bs", "sd_bs", "med_bs", "count"],
+    ].reset_index(drop=True)
 
 
 if __name__ == "__main__":
@@ -2,10 +2,12 @@
 Functions for setting up DuckDB database.
 """
 
+from . import cache
 from . import db
 from . import model
 from . import scrape
 from . import update
+from .data import IdType
 from tqdm import tqdm
 
 
@@ -54,11 +56,15 @@ def initialize_data(competition_id: int, start: int, end: int):
             ]
             db.update_matches_stats(completed_matches)
         else:  # use fotmob match data
-            completed_matches = [
-                FM.get_completed_match_stats(competition_id, season, m.fotmob_id)  # type: ignore - fotmob_id is never None
-                for m in tqdm(fotmob_matches)
-                if m.completed
-            ]
+            fotmob_id_to_club = db.get_clubs_by_id_map(
+                IdType.FOTMOB, competition_id, season
+            )
+            completed_matches = FM.get_completed_matches_stats(
+                competition_id,
+                season,
+                [m.fotmob_id for m in fotmob_matches if m.completed],  # type: ignore - fotmob_id is never None
+                fotmob_id_to_club,
+            )
             db.update_matches_stats(completed_matches)
 
         # order of these updates matters
@@ -76,6 +82,10 @@ def initialize_data(competition_id: int, start: int, end: int):
     # does nothing if no predictions to make
     update.update_predictions(competition_id, end - 1, AVG_BASE, HOME_ADVANTAGE)
 
+    # release lock on db file, so other tools can open it
+    db.close()
+    print(cache.format_stats())
+
 
 if __name__ == "__main__":
     initialize_data(1, 2017, 2025)
@@ -2,9 +2,13 @@
 Model functions.
 """
 
-import copy
+import atexit
 import csv
 import numpy as np
+import os
+import pickle
+import tempfile
+import threading
 from . import db, scoring, scrape
 from .data import (
     TableSnapshot,
@@ -15,16 +19,33 @@ from .data import (
     SimClubSnapshot,
     SimResults,
     Performance,
+    RatingWindow,
+    RunCheckpoint,
 )
-from collections import defaultdict, deque
+from collections import defaultdict
 from datetime import date, datetime, timedelta
-from itertools import repeat
-from multiprocessing import Pool
+from multiprocessing.pool import Pool
+from numpy.typing import ArrayLike
 from scipy.stats import skellam
 from tqdm import tqdm
 
-PROCESSES = 10  # number of processes to spawn for match simulations
-CHUNKSIZE = 25  # number of simulations performed by each process at a time
+PROCESSES = os.cpu_count() or 1  # number of processes in simulation worker pool
+CHUNKSIZE = 1000  # number of simulations performed by each process at a time
+SIM_ROUND_BATCHES = 4  # batches submitted at a time in adaptive sims
+SIM_TOLERANCE = 0.01  # max std error of position probabilities in adaptive sims
+SIM_PTS_TOLERANCE = 0.25  # max std error of avg pts in adaptive sims
+# remaining matches below which sim_expected is used; 0 (off) until validated
+# against full simulation, see sim_expected
+EXPECTED_THRESHOLD = 0
+# directory of files holding packed simulation inputs; shared memory if available
+SIM_INPUTS_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+PROBS_TABLE_STEP = 0.01  # grid spacing of outcome probability lookup table
+PROBS_TABLE_MAX = 8.0  # max projected goals covered by lookup table
+CHECKPOINT_DIR = "data/checkpoints"  # run_seasons checkpoints, one per competition
+
+_probs_table: tuple[np.ndarray, np.ndarray] | None = None
+_pool: Pool | None = None  # simulation worker pool shared by sim_from_date calls
+_pool_lock = threading.Lock()  # guards starting _pool from concurrent threads
 
 
 def read_deductions_csv(
@@ -52,86 +73,593 @@ def read_deductions_csv(
     return d
 
 
-def sim(
-    args: tuple[
-        dict[int, SimTableSnapshot],
-        dict[int, SimClubSnapshot],
-        list[tuple[int, int]],
-        float,
-        float,
-    ]
-) -> list[SimTableSnapshot]:
-    """Performs single simulation of remaining matches to end of season.
+def get_checkpoint_path(competition_id: int) -> str:
+    """Gets path of given competition's run_seasons checkpoint.
 
     Args:
-        args (tuple[ dict[int, SimTableSnapshot], dict[int, SimClubSnapshot], list[tuple[int, int]], float, float ]):
-            (club id -> SimTableSnapshot, club id -> SimClubSnapshot, list of
-            (club_id_1, club_id_2) for each remaining match, avg base, home
-            advantage)
+        competition_id (int): competition's db id, ex. 1 for Premier League
 
     Returns:
-        list[SimTableSnapshot]: sorted end-of-season table
+        str: relative path to checkpoint file
     """
-    table_map, clubs_map, matches, avg_base, home_advantage = args
+    return os.path.join(CHECKPOINT_DIR, f"run_seasons_{competition_id}.pkl")
 
-    # simulate all matches to end of season
-    tm = {k: copy.copy(table_map[k]) for k in table_map}
-    cm = {
-        k: SimClubSnapshot(clubs_map[k].mp_off.copy(), clubs_map[k].mp_def.copy())
-        for k in clubs_map
-    }
 
-    for row in matches:
-        # calculate projected goals scored per team
-        club_id_1 = row[0]
-        club_id_2 = row[1]
+def save_checkpoint(checkpoint: RunCheckpoint):
+    """Saves run_seasons checkpoint, replacing competition's previous one.
+
+    Args:
+        checkpoint (RunCheckpoint): model state after last completed season
+    """
+    path = get_checkpoint_path(checkpoint.competition_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # write to temp file first so a crash never leaves a partial checkpoint
+    with open(path + ".tmp", "wb") as fd:
+        pickle.dump(checkpoint, fd)
+    os.replace(path + ".tmp", path)
+
+
+def load_checkpoint(competition_id: int) -> RunCheckpoint | None:
+    """Loads competition's run_seasons checkpoint, if any.
+
+    Args:
+        competition_id (int): competition's db id, ex. 1 for Premier League
+
+    Returns:
+        RunCheckpoint | None: model state after last completed season, or None
+            if there is no checkpoint
+    """
+    path = get_checkpoint_path(competition_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as fd:
+        return pickle.load(fd)
+
 
-        off_1 = compute_rating(cm[club_id_1].mp_off)
-        def_1 = compute_rating(cm[club_id_1].mp_def)
+def get_sim_pool() -> Pool:
+    """Gets simulation worker pool, starting it on first use.
+
+    The pool lives until close_sim_pool is called or the process exits, so
+    workers are reused across every sim_from_date call in a run. Threads may
+    share the pool; their tasks are interleaved across its workers.
+
+    Returns:
+        Pool: simulation worker pool with PROCESSES workers
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = Pool(processes=PROCESSES)
+            atexit.register(close_sim_pool)
+        return _pool
+
+
+def close_sim_pool():
+    """Shuts down simulation worker pool, if running."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        atexit.unregister(close_sim_pool)
+        pool.close()
+        pool.join()
+
+
+def pack_sim_inputs(
+    table_map: dict[int, SimTableSnapshot],
+    clubs_map: dict[int, SimClubSnapshot],
+    matches: list[tuple[int, int, int]],
+    avg_base: float,
+    home_advantage: float,
+) -> np.ndarray:
+    """Packs simulation inputs into one flat float64 array.
+
+    Layout: [clubs, matches, avg base, home advantage], then per club pts, gd,
+    gf, and window length; (club 1 index, club 2 index, match id) per match;
+    offensive then defensive match performances per club, most recent first,
+    zero-padded to RatingWindow.SIZE; and offensive then defensive window sums
+    and weighted sums per club. Clubs are indexed in table_map order.
+
+    Args:
+        table_map (dict[int, SimTableSnapshot]): club id -> SimTableSnapshot
+        clubs_map (dict[int, SimClubSnapshot]): club id -> SimClubSnapshot
+        matches (list[tuple[int, int, int]]): (club_id_1, club_id_2, match id)
+            for each remaining match
+        avg_base (float): avg goals scored per team, per match in this
+            competition
+        home_advantage (float): avg goals scored above base by home teams in
+            this competition
+
+    Returns:
+        np.ndarray: packed inputs, to be read with unpack_sim_inputs
+    """
+    club_ids = list(table_map.keys())
+    index = {cid: i for i, cid in enumerate(club_ids)}
+    windows = [(clubs_map[cid].mp_off, clubs_map[cid].mp_def) for cid in club_ids]
+
+    mps = np.zeros((2, len(club_ids), RatingWindow.SIZE))
+    for i, club_windows in enumerate(windows):
+        for k, window in enumerate(club_windows):
+            mps[k, i, : len(window)] = list(window)
+
+    return np.concatenate(
+        (
+            [len(club_ids), len(matches), avg_base, home_advantage],
+            [table_map[cid].pts for cid in club_ids],
+            [table_map[cid].gd for cid in club_ids],
+            [table_map[cid].gf for cid in club_ids],
+            [len(w[0]) for w in windows],
+            [x for c1, c2, mid in matches for x in (index[c1], index[c2], mid)],
+            mps.ravel(),
+            [w[k].sum for k in range(2) for w in windows],
+            [w[k].weighted_sum for k in range(2) for w in windows],
+        ),
+        dtype=np.float64,
+    )
+
+
+def unpack_sim_inputs(inputs: np.ndarray) -> tuple[
+    float,
+    float,
+    np.ndarray,
+    np.ndarray,
+    np.ndarray,
+    np.ndarray,
+    np.ndarray,
+    np.ndarray,
+    np.ndarray,
+    np.ndarray,
+    np.ndarray,
+]:
+    """Unpacks simulation inputs packed by pack_sim_inputs.
+
+    Args:
+        inputs (np.ndarray): packed inputs
+
+    Returns:
+        tuple[float, float, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+            (avg base, home advantage, pts, gd, gf, window lengths, matches as
+            (matches, 2) club indices, match ids, match performances
+            (2, clubs, SIZE), window sums (2, clubs), window weighted sums
+            (2, clubs))
+    """
+    n = int(inputs[0])
+    m = int(inputs[1])
+    pts, gd, gf, length, matches, mps, total, weighted = np.split(
+        inputs[4:],
+        np.cumsum([n, n, n, n, 3 * m, 2 * n * RatingWindow.SIZE, 2 * n]),
+    )
+    matches = matches.astype(int).reshape(m, 3)
+    return (
+        float(inputs[2]),
+        float(inputs[3]),
+        pts.astype(int),
+        gd.astype(int),
+        gf.astype(int),
+        length.astype(int),
+        matches[:, :2],
+        matches[:, 2],
+        mps.reshape(2, n, RatingWindow.SIZE),
+        total.reshape(2, n),
+        weighted.reshape(2, n),
+    )
+
+
+def poisson_ppf(u: np.ndarray, lam: np.ndarray) -> np.ndarray:
+    """Computes poisson quantiles by inversion of the cdf.
+
+    Args:
+        u (np.ndarray): uniform draws in [0, 1)
+        lam (np.ndarray): poisson means, same shape as u
+
+    Returns:
+        np.ndarray: smallest k with P(X <= k) >= u, elementwise
+    """
+    k = np.zeros(u.shape, dtype=np.int64)
+    p = np.exp(-lam)
+    cdf = p.copy()
+    active = u > cdf
+    while active.any():
+        k += active
+        p = np.where(active, p * lam / np.maximum(k, 1), p)
+        cdf += np.where(active, p, 0)
+        active = u > cdf
+    return k
+
+
+def sim_batch(args: tuple[str, int, np.random.SeedSequence, bool]) -> np.ndarray:
+    """Performs batch of simulations of remaining matches to end of season.
+
+    All simulations in the batch are stepped through the remaining matches
+    together. State is kept as arrays: pts, gd, and gf are (simulations, clubs),
+    and offensive/defensive match performances are (2, simulations, clubs, 25)
+    ring buffers with running sums, mirroring RatingWindow. Each club's ring
+    buffer head and length are shared by all simulations, since every
+    simulation plays the same matches.
+
+    With variance reduction, scores are drawn by inverting the poisson cdf at
+    uniforms from a stream keyed by (seed, match id), so a fixture gets the
+    same draws in every call sharing seed; the second half of the batch reuses
+    the first half's uniforms as 1 - u (antithetic draws).
+
+    The batch is aggregated before returning, so only a small (clubs, clubs + 3)
+    array is sent back to the parent process regardless of batch size.
 
-        off_2 = compute_rating(cm[club_id_2].mp_off)
-        def_2 = compute_rating(cm[club_id_2].mp_def)
+    Args:
+        args (tuple[str, int, np.random.SeedSequence, bool]): (path to inputs
+            packed by pack_sim_inputs, number of simulations, seed of this
+            batch's random stream, whether to use variance reduction)
 
-        proj_1 = compute_projected_goals(
-            (cm[club_id_1].mp_off), def_2, True, avg_base, home_advantage
+    Returns:
+        np.ndarray: batch aggregate from aggregate_batch, clubs in table_map
+            order
+    """
+    path, simulations, seed, variance_reduction = args
+
+    (
+        avg_base,
+        home_advantage,
+        init_pts,
+        init_gd,
+        init_gf,
+        length,
+        matches,
+        match_ids,
+        init_mps,
+        init_total,
+        init_weighted,
+    ) = unpack_sim_inputs(np.memmap(path, dtype=np.float64, mode="r"))
+    n = len(length)
+
+    pts = np.tile(init_pts, (simulations, 1))
+    gd = np.tile(init_gd, (simulations, 1))
+    gf = np.tile(init_gf, (simulations, 1))
+
+    # index 0 along first axis is offensive, 1 is defensive; slot head[i] holds
+    # club i's most recent performance, (head[i] + k) % SIZE the one k matches
+    # earlier
+    size = RatingWindow.SIZE
+    mps = np.repeat(init_mps[:, np.newaxis], simulations, axis=1)
+    total = np.repeat(init_total[:, np.newaxis], simulations, axis=1)
+    weighted = np.repeat(init_weighted[:, np.newaxis], simulations, axis=1)
+    head = np.zeros(n, dtype=int)
+
+    norms = RatingWindow.NORMS
+    scale = avg_base * 0.424 + 0.548
+
+    def rating(k: int, i: int) -> np.ndarray:
+        # vectorized compute_rating
+        return weighted[k, :, i] / norms[length[i]]
+
+    def projected_goals(i: int, opp_def: np.ndarray, ha: float) -> np.ndarray:
+        # vectorized compute_projected_goals
+        projected_mp = rating(0, i) * norms[min(length[i] + 1, size)] - (
+            weighted[0, :, i] - RatingWindow.STEP * total[0, :, i]
         )
-        proj_2 = compute_projected_goals(
-            (cm[club_id_2].mp_off), def_1, False, avg_base, home_advantage
+        return np.maximum(
+            0,
+            (projected_mp - ha - avg_base) * (opp_def * 0.424 + 0.548) / scale
+            + opp_def,
         )
 
-        # randomly draw scores independently based on poisson
-        rng_1 = np.random.default_rng()
-        score_1 = rng_1.poisson(proj_1)
+    def mp(comp: np.ndarray, opp: np.ndarray, ha: float) -> np.ndarray:
+        # vectorized compute_mp
+        return np.maximum(
+            0, (comp - opp) / (opp * 0.424 + 0.548) * scale + avg_base + ha
+        )
 
-        rng_2 = np.random.default_rng()
-        score_2 = rng_2.poisson(proj_2)
+    def push(i: int, new: np.ndarray):
+        # vectorized RatingWindow.push for offensive and defensive windows
+        evicted = mps[:, :, i, (head[i] - 1) % size] if length[i] == size else 0
+        weighted[:, :, i] += new - RatingWindow.STEP * total[:, :, i]
+        total[:, :, i] += new - evicted
+        head[i] = (head[i] - 1) % size
+        length[i] = min(length[i] + 1, size)
+        mps[:, :, i, head[i]] = new
+
+    rng = np.random.default_rng(seed)
+    half = (simulations + 1) // 2
+
+    for (i1, i2), match_id in zip(matches.tolist(), match_ids.tolist()):
+        off_1 = rating(0, i1)
+        def_1 = rating(1, i1)
+        off_2 = rating(0, i2)
+        def_2 = rating(1, i2)
+
+        proj_1 = projected_goals(i1, def_2, -home_advantage)
+        proj_2 = projected_goals(i2, def_1, home_advantage)
+
+        # randomly draw all scores for this match independently based on poisson
+        if variance_reduction:
+            u = np.random.default_rng(
+                np.random.SeedSequence(
+                    seed.entropy, spawn_key=(*seed.spawn_key, match_id)
+                )
+            ).random((2, half))
+            u = np.concatenate((u, 1 - u), axis=1)[:, :simulations]
+            score_1, score_2 = poisson_ppf(u, np.stack((proj_1, proj_2)))
+        else:
+            score_1, score_2 = rng.poisson(np.stack((proj_1, proj_2)))
 
         # update match performances based on score
-        mp_off_1 = compute_mp(score_1, def_2, True, True, avg_base, home_advantage)
-        mp_def_1 = compute_mp(score_2, off_2, True, False, avg_base, home_advantage)
-        mp_off_2 = compute_mp(score_2, def_1, False, True, avg_base, home_advantage)
-        mp_def_2 = compute_mp(score_1, off_1, False, False, avg_base, home_advantage)
-
-        cm[club_id_1].mp_off.appendleft(mp_off_1)
-        cm[club_id_1].mp_def.appendleft(mp_def_1)
-        cm[club_id_2].mp_off.appendleft(mp_off_2)
-        cm[club_id_2].mp_def.appendleft(mp_def_2)
+        push(
+            i1,
+            np.stack(
+                (
+                    mp(score_1, def_2, -home_advantage),
+                    mp(score_2, off_2, home_advantage),
+                )
+            ),
+        )
+        push(
+            i2,
+            np.stack(
+                (
+                    mp(score_2, def_1, home_advantage),
+                    mp(score_1, off_1, -home_advantage),
+                )
+            ),
+        )
 
         # deductions should not be taken into account, since they will already
         # be factored into the existing data structures if passed; can't predict
         # future deductions
-        res = "W" if score_1 > score_2 else "D" if score_1 == score_2 else "L"
-        tm[club_id_1].gd += score_1 - score_2
-        tm[club_id_1].gf += score_1
-        tm[club_id_1].pts += 3 if res == "W" else 1 if res == "D" else 0
+        gd[:, i1] += score_1 - score_2
+        gd[:, i2] += score_2 - score_1
+        gf[:, i1] += score_1
+        gf[:, i2] += score_2
+        pts[:, i1] += np.where(score_1 > score_2, 3, score_1 == score_2)
+        pts[:, i2] += np.where(score_2 > score_1, 3, score_1 == score_2)
+
+    return aggregate_batch(pts, gd, gf)
+
+
+def aggregate_batch(pts: np.ndarray, gd: np.ndarray, gf: np.ndarray) -> np.ndarray:
+    """Aggregates a batch of end-of-season tables.
+
+    Clubs are ranked by pts, gd, gf; remaining ties keep table_map order.
+
+    Args:
+        pts (np.ndarray): end-of-season pts, shape (simulations, clubs)
+        gd (np.ndarray): end-of-season gd, shape (simulations, clubs)
+        gf (np.ndarray): end-of-season gf, shape (simulations, clubs)
+
+    Returns:
+        np.ndarray: shape (clubs, clubs + 3); row i holds club i's number of
+            finishes in each position, then its total pts, total gd, and total
+            squared pts
+    """
+    n = pts.shape[1]
+    # order[s, k] is column index of club finishing in position k of sim s
+    order = np.lexsort((-gf, -gd, -pts), axis=-1)
+    flat = (order * n + np.arange(n)).ravel()
+    counts = np.bincount(flat, minlength=n * n).reshape(n, n)
+    return np.column_stack(
+        (counts, pts.sum(axis=0), gd.sum(axis=0), (pts * pts).sum(axis=0))
+    )
+
+
+def compute_sim_std_errors(
+    totals: np.ndarray, simulations: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Computes Monte Carlo std errors of aggregated simulation results.
+
+    Args:
+        totals (np.ndarray): sum of aggregate_batch results, shape
+            (clubs, clubs + 3)
+        simulations (int): number of simulations aggregated in totals
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: per club, max std error of its position
+            probabilities and std error of its avg pts
+    """
+    n = totals.shape[0]
+    probs = totals[:, :n] / simulations
+    std_error = np.sqrt(probs * (1 - probs) / simulations).max(axis=1)
+    avg_pts = totals[:, n] / simulations
+    var_pts = np.maximum(0, totals[:, n + 2] / simulations - avg_pts**2)
+    return std_error, np.sqrt(var_pts / simulations)
+
+
+def compute_pts_distributions(
+    matches: list[tuple[int, int]],
+    n: int,
+    prob_1: np.ndarray,
+    prob_2: np.ndarray,
+    prob_d: np.ndarray,
+) -> np.ndarray:
+    """Computes each club's exact distribution of pts from remaining matches.
+
+    Results of different matches are independent once projected goals are
+    fixed, so a club's distribution is the convolution of its matches' W/D/L
+    distributions.
+
+    Args:
+        matches (list[tuple[int, int]]): (club 1 index, club 2 index) of each
+            remaining match
+        n (int): number of clubs
+        prob_1 (np.ndarray): club 1 win probability of each match
+        prob_2 (np.ndarray): club 2 win probability of each match
+        prob_d (np.ndarray): draw probability of each match
+
+    Returns:
+        np.ndarray: shape (n, 3 * len(matches) + 1); row i holds probabilities
+            of club i gaining 0, 1, 2, ... pts
+    """
+    dists = np.zeros((n, 3 * len(matches) + 1))
+    dists[:, 0] = 1
+    for k, (i1, i2) in enumerate(matches):
+        for i, win, loss in ((i1, prob_1[k], prob_2[k]), (i2, prob_2[k], prob_1[k])):
+            # a club gains at most 3 pts per match, so rolled-over entries are 0
+            dists[i] = (
+                loss * dists[i]
+                + prob_d[k] * np.roll(dists[i], 1)
+                + win * np.roll(dists[i], 3)
+            )
+    return dists
+
+
+def sim_expected(
+    table_map: dict[int, SimTableSnapshot],
+    clubs_map: dict[int, SimClubSnapshot],
+    matches: list[tuple[int, int, int]],
+    avg_base: float,
+    home_advantage: float,
+    simulations: int = 10000,
+    seed: int | list[int] | np.random.SeedSequence | None = None,
+    tolerance: float | None = None,
+    pts_tolerance: float | None = None,
+    variance_reduction: bool = False,
+) -> dict[int, SimResults]:
+    """Projects remaining matches with ratings updated by expectation.
+
+    Intended for the last few matchweeks. After each match, clubs' windows take
+    the match performances of its projected goals instead of simulated ones,
+    so every match's projected goals are fixed up front. Each club's pts
+    distribution is then computed exactly by convolving its matches' W/D/L
+    probabilities (see compute_pts_distributions), and avg pts come from it;
+    avg gd is the exact sum of its matches' expected goal differences. Both
+    are free of sampling noise, so pts_std_error is 0.
+
+    Position probabilities are Monte Carlo estimates from scores drawn at these
+    fixed projected goals, since head-to-head matches and gd tie-breaks make
+    positions depend jointly on all results. Without ratings to update, each
+    batch costs only a few array operations, so batches run in this process.
+    Batches, streams, and adaptive stopping otherwise follow sim_from_date.
+
+    Freezing projected goals ignores how results move ratings within the
+    remaining matches, so positions differ from full simulation by up to a few
+    percentage points; sim_from_date only uses this if expected_threshold is
+    set.
+
+    Args:
+        table_map (dict[int, SimTableSnapshot]): club id -> SimTableSnapshot
+        clubs_map (dict[int, SimClubSnapshot]): club id -> SimClubSnapshot
+        matches (list[tuple[int, int, int]]): (club_id_1, club_id_2, match id)
+            for each remaining match
+        avg_base (float): avg goals scored per team, per match in this
+            competition
+        home_advantage (float): avg goals scored above base by home teams in
+            this competition
+        simulations (int, optional): max number of simulations to run.
+            Defaults to 10000.
+        seed (int | list[int] | np.random.SeedSequence | None, optional):
+            master seed of simulation random streams. Defaults to None (fresh
+            OS entropy).
+        tolerance (float | None, optional): max std error of position
+            probabilities for adaptive stopping. Defaults to None.
+        pts_tolerance (float | None, optional): max std error of avg pts for
+            adaptive stopping, always met since avg pts are exact. Defaults to
+            None.
+        variance_reduction (bool, optional): if True, use common random
+            numbers and antithetic draws. Defaults to False.
+
+    Returns:
+        dict[int, SimResults]: club id -> results, with exact total_pts and
+            total_gd
+    """
+    club_ids = list(table_map.keys())
+    index = {cid: i for i, cid in enumerate(club_ids)}
+    n = len(club_ids)
+    windows = {
+        cid: (clubs_map[cid].mp_off.copy(), clubs_map[cid].mp_def.copy())
+        for cid in club_ids
+    }
 
-        res = "W" if score_1 < score_2 else "D" if score_1 == score_2 else "L"
-        tm[club_id_2].gd += score_2 - score_1
-        tm[club_id_2].gf += score_2
-        tm[club_id_2].pts += 3 if res == "W" else 1 if res == "D" else 0
+    proj = np.zeros((2, len(matches)))
+    for k, (c1, c2, _) in enumerate(matches):
+        (off_1, def_1), (off_2, def_2) = windows[c1], windows[c2]
+        off_rating_1, def_rating_1 = compute_rating(off_1), compute_rating(def_1)
+        off_rating_2, def_rating_2 = compute_rating(off_2), compute_rating(def_2)
+        proj[0, k] = compute_projected_goals(
+            off_1, def_rating_2, True, avg_base, home_advantage
+        )
+        proj[1, k] = compute_projected_goals(
+            off_2, def_rating_1, False, avg_base, home_advantage
+        )
+
+        for window, args in (
+            (off_1, (proj[0, k], def_rating_2, True, True)),
+            (def_1, (proj[1, k], off_rating_2, True, False)),
+            (off_2, (proj[1, k], def_rating_1, False, True)),
+            (def_2, (proj[0, k], off_rating_1, False, False)),
+        ):
+            window.push(compute_mp(*args, avg_base, home_advantage))
+
+    # home[k, i] = 1 if club i is club 1 in match k, away likewise for club 2
+    home = np.zeros((len(matches), n), dtype=np.int64)
+    away = np.zeros((len(matches), n), dtype=np.int64)
+    for k, (c1, c2, _) in enumerate(matches):
+        home[k, index[c1]] = 1
+        away[k, index[c2]] = 1
+
+    init_pts = np.array([table_map[cid].pts for cid in club_ids])
+    init_gd = np.array([table_map[cid].gd for cid in club_ids])
+    init_gf = np.array([table_map[cid].gf for cid in club_ids])
+
+    prob_1, prob_2, prob_d = compute_outcome_probs(proj[0], proj[1])
+    pts_dists = compute_pts_distributions(
+        [(index[c1], index[c2]) for c1, c2, _ in matches], n, prob_1, prob_2, prob_d
+    )
+    exp_pts = init_pts + pts_dists @ np.arange(pts_dists.shape[1])
+    exp_gd = init_gd + (proj[0] - proj[1]) @ (home - away)
+
+    batch_size = min(CHUNKSIZE, simulations)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    adaptive = tolerance is not None or pts_tolerance is not None
+    totals = np.zeros((n, n + 3), dtype=np.int64)
+    done = 0
+
+    for b, batch_simulations in enumerate(
+        min(batch_size, simulations - i) for i in range(0, simulations, batch_size)
+    ):
+        # key streams by batch index (and match id), as in sim_from_date
+        batch_seed = np.random.SeedSequence(
+            seed.entropy, spawn_key=(*seed.spawn_key, b)
+        )
+        if variance_reduction:
+            half = (batch_simulations + 1) // 2
+            scores = np.zeros((2, batch_simulations, len(matches)), dtype=np.int64)
+            for k, (_, _, match_id) in enumerate(matches):
+                u = np.random.default_rng(
+                    np.random.SeedSequence(
+                        batch_seed.entropy,
+                        spawn_key=(*batch_seed.spawn_key, match_id),
+                    )
+                ).random((2, half))
+                u = np.concatenate((u, 1 - u), axis=1)[:, :batch_simulations]
+                scores[:, :, k] = poisson_ppf(
+                    u, np.broadcast_to(proj[:, k, np.newaxis], u.shape)
+                )
+            score_1, score_2 = scores
+        else:
+            score_1, score_2 = np.random.default_rng(batch_seed).poisson(
+                proj[:, np.newaxis], (2, batch_simulations, len(matches))
+            )
+        res_1 = np.where(score_1 > score_2, 3, score_1 == score_2)
+        res_2 = np.where(score_2 > score_1, 3, score_1 == score_2)
+        totals += aggregate_batch(
+            init_pts + res_1 @ home + res_2 @ away,
+            init_gd + (score_1 - score_2) @ (home - away),
+            init_gf + score_1 @ home + score_2 @ away,
+        )
+        done += batch_simulations
 
-    # sort table_map by pts, gd, gf
-    return sorted(tm.values(), key=lambda t: (t.pts, t.gd, t.gf), reverse=True)
+        std_error, _ = compute_sim_std_errors(totals, done)
+        if adaptive and (tolerance is None or std_error.max() <= tolerance):
+            break
+
+    return {
+        cid: SimResults(
+            counts=totals[i, :n].tolist(),
+            total_pts=float(exp_pts[i] * done),
+            total_gd=float(exp_gd[i] * done),
+            simulations=done,
+            std_error=float(std_error[i]),
+        )
+        for i, cid in enumerate(club_ids)
+    }
 
 
 def sim_from_date(
@@ -143,9 +671,34 @@ def sim_from_date(
     avg_base: float,
     home_advantage: float,
     simulations: int = 10000,
+    seed: int | list[int] | np.random.SeedSequence | None = None,
+    tolerance: float | None = None,
+    pts_tolerance: float | None = None,
+    variance_reduction: bool = False,
+    expected_threshold: int = EXPECTED_THRESHOLD,
 ) -> dict[int, SimResults]:
     """Simulates matches from start_date to end of season.
 
+    If fewer than expected_threshold matches remain, sim_expected is used
+    instead, with the same simulations, seed, tolerances, and
+    variance_reduction. It is off by default, since its positions only
+    approximate full simulation.
+
+    Simulations run in batches of up to CHUNKSIZE, each drawing from its own
+    random stream keyed by seed and batch index. Results are reproducible for a
+    given seed and simulations, whatever PROCESSES is; the pool only decides
+    which worker runs each batch.
+
+    If tolerance or pts_tolerance is set, simulations run adaptively in rounds
+    of SIM_ROUND_BATCHES batches. Std errors are checked after each batch, and
+    simulations stop once every club's are within the set tolerances or
+    simulations have been run.
+
+    With variance_reduction, draws use common random numbers keyed by seed,
+    batch, and match id, plus antithetic pairs (see sim_batch). Calls sharing
+    a seed then draw the same scores for a fixture, so differences between
+    their projections reflect changed inputs rather than sampling noise.
+
     Args:
         competition_id (int): competition's db id, ex. 1 for Premier League
         season (int): earlier year of season (ex. 2016 means 2016/17)
@@ -157,42 +710,119 @@ def sim_from_date(
             performances
         simulations (int, optional): number of simulations to run. Defaults to
             10000.
+        seed (int | list[int] | np.random.SeedSequence | None, optional):
+            master seed of simulation random streams. Defaults to None (fresh
+            OS entropy).
+        tolerance (float | None, optional): max std error of position
+            probabilities for adaptive stopping. Defaults to None.
+        pts_tolerance (float | None, optional): max std error of avg pts for
+            adaptive stopping. Defaults to None.
+        variance_reduction (bool, optional): if True, use common random
+            numbers and antithetic draws. Defaults to False.
+        expected_threshold (int, optional): number of remaining matches below
+            which sim_expected is used. Defaults to EXPECTED_THRESHOLD (0,
+            never).
 
     Returns:
         dict[int, SimResults]: club id -> results
     """
     # no matches on start_date should already be run in calling function
     matches = db.get_matches_sim(competition_id, season, start_date)
-    matches_club_ids = [(m.club_id_1, m.club_id_2) for m in matches]
-
-    sim_results: dict[int, SimResults] = {
-        cid: SimResults(
-            counts=[0] * len(clubs_map),
-            total_pts=0,
-            total_gd=0,
+    matches_club_ids = [(m.club_id_1, m.club_id_2, m.id) for m in matches]
+    if len(matches) < expected_threshold:
+        return sim_expected(
+            table_map,
+            clubs_map,
+            matches_club_ids,
+            avg_base,
+            home_advantage,
             simulations=simulations,
+            seed=seed,
+            tolerance=tolerance,
+            pts_tolerance=pts_tolerance,
+            variance_reduction=variance_reduction,
         )
-        for cid in clubs_map.keys()
+    club_ids = list(table_map.keys())
+    n = len(club_ids)
+
+    # fixed-size batches, so streams and batch results don't depend on PROCESSES
+    batch_size = min(CHUNKSIZE, simulations)
+    adaptive = tolerance is not None or pts_tolerance is not None
+    # adaptive rounds are a fixed number of batches, so early stopping saves
+    # work whatever the pool size
+    round_size = batch_size * SIM_ROUND_BATCHES if adaptive else simulations
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    totals = np.zeros((n, n + 3), dtype=np.int64)
+    done = 0
+    converged = False
+
+    # pack inputs once into a file that workers map read-only, so tasks only
+    # carry its path, a simulation count, and a seed
+    fd, path = tempfile.mkstemp(prefix="efi-sim-", dir=SIM_INPUTS_DIR)
+    os.close(fd)
+    try:
+        pack_sim_inputs(
+            table_map, clubs_map, matches_club_ids, avg_base, home_advantage
+        ).tofile(path)
+
+        with tqdm(total=simulations) as bar:
+            while done < simulations and not converged:
+                round_simulations = min(round_size, simulations - done)
+                batches = [
+                    min(batch_size, round_simulations - i)
+                    for i in range(0, round_simulations, batch_size)
+                ]
+                # key streams by batch index, so each call with this seed draws
+                # the same numbers in each batch
+                first = done // batch_size
+                batch_seeds = [
+                    np.random.SeedSequence(
+                        seed.entropy, spawn_key=(*seed.spawn_key, first + b)
+                    )
+                    for b in range(len(batches))
+                ]
+                tasks = [
+                    (path, s, batch_seed, variance_reduction)
+                    for s, batch_seed in zip(batches, batch_seeds)
+                ]
+                results = get_sim_pool().imap(sim_batch, tasks)
+                # check after each batch, in order, so the stopping point
+                # depends only on seed and tolerances
+                for batch_simulations, batch_totals in zip(batches, results):
+                    totals += batch_totals
+                    done += batch_simulations
+                    bar.update(batch_simulations)
+
+                    std_error, pts_std_error = compute_sim_std_errors(totals, done)
+                    converged = adaptive and (
+                        (tolerance is None or std_error.max() <= tolerance)
+                        and (
+                            pts_tolerance is None
+                            or pts_std_error.max() <= pts_tolerance
+                        )
+                    )
+                    if converged:
+                        bar.total = done
+                        break
+                # wait out rest of round before its inputs file is removed
+                for _ in results:
+                    pass
+    finally:
+        os.remove(path)
+
+    return {
+        cid: SimResults(
+            counts=totals[i, :n].tolist(),
+            total_pts=int(totals[i, n]),
+            total_gd=int(totals[i, n + 1]),
+            simulations=done,
+            std_error=float(std_error[i]),
+            pts_std_error=float(pts_std_error[i]),
+        )
+        for i, cid in enumerate(club_ids)
     }
 
-    with Pool(processes=PROCESSES) as pool, tqdm(total=simulations) as bar:
-        for ordered_table in pool.imap(
-            sim,
-            repeat(
-                (table_map, clubs_map, matches_club_ids, avg_base, home_advantage),
-                simulations,
-            ),
-            chunksize=CHUNKSIZE,
-        ):
-            for i, t in enumerate(ordered_table):
-                sim_results[t.club_id].counts[i] += 1
-                sim_results[t.club_id].total_gd += t.gd
-                sim_results[t.club_id].total_pts += t.pts
-            bar.update()
-            bar.refresh()
-
-    return sim_results
-
 
 def run_seasons(
     competition_id: int,
@@ -201,9 +831,15 @@ def run_seasons(
     save: bool = False,
     sim: bool = False,
     performance: bool = False,
+    seed: int | None = None,
+    variance_reduction: bool = False,
+    resume: bool = False,
 ):
     """Computes predictions and ratings for each match.
 
+    With save=True, each season's results are written to the database as soon
+    as the season is done, along with a checkpoint of the model state.
+
     Args:
         competition_id (int): competition's db id, ex. 1 for Premier League
         start (int): earlier year of first season (ex. 2016 means 2016/17)
@@ -215,6 +851,16 @@ def run_seasons(
             Defaults to False.
         performance (bool, optional): if True, print model performance after
             running all seasons. Defaults to False.
+        seed (int | None, optional): master seed of projection simulations;
+            each sim_from_date call gets its own stream spawned from it.
+            Defaults to None (fresh OS entropy).
+        variance_reduction (bool, optional): if True, projections use common
+            random numbers and antithetic draws, with every projection sharing
+            the master seed so fixtures get the same draws week to week.
+            Defaults to False.
+        resume (bool, optional): if True, continue from competition's
+            checkpoint, skipping seasons already saved; the master seed is
+            restored from the checkpoint. Defaults to False.
     """
     # get avg_base and home_advantage from database
     competition = db.get_competition_by_id(competition_id)
@@ -240,14 +886,34 @@ def run_seasons(
     deductions = read_deductions_csv()
 
     table_map: dict[int, TableSnapshot] = {}  # club id -> TableSnapshot
-    history: list[TableSnapshot] = []  # for db insertion
-    match_predictions_performances: list[Match] = []  # for db insertion
-    projections: list[Projection] = []  # for db insertion
 
     # model performance
     P = Performance()
 
+    sim_seed = np.random.SeedSequence(seed)  # spawns a stream per projection
+
+    first_season = start
+    checkpoint = load_checkpoint(competition_id) if resume else None
+    if checkpoint is not None:
+        if checkpoint.start != start:
+            raise ValueError(
+                f"Checkpoint for competition {competition_id} starts at {checkpoint.start}, not {start}"
+            )
+        first_season = checkpoint.season
+        table_map = checkpoint.table_map
+        P = checkpoint.performance
+        sim_seed = np.random.SeedSequence(
+            checkpoint.sim_seed_entropy,
+            n_children_spawned=checkpoint.sim_seeds_spawned,
+        )
+
     for i, season in enumerate(range(start, end)):
+        if season < first_season:
+            continue
+
+        history: list[TableSnapshot] = []  # for db insertion
+        projections: list[Projection] = []  # for db insertion
+
         clubs = db.get_clubs(competition_id, season)
 
         # remove clubs that aren't in current season from table_map
@@ -287,8 +953,8 @@ def run_seasons(
 
             clubs_map[club.id] = ClubSnapshot(
                 name=club.name,
-                mp_off=deque([starting_off], 25),
-                mp_def=deque([starting_def], 25),
+                mp_off=RatingWindow([starting_off]),
+                mp_def=RatingWindow([starting_def]),
                 efi=[compute_efi(starting_off, starting_def)],
             )
 
@@ -308,6 +974,10 @@ def run_seasons(
         completed_matches = db.get_matches(competition_id, season, completed=True)
         current_matchweek = 0
 
+        season_predictions_performances: list[Match] = []
+        season_proj_goals: list[tuple[float, float]] = []
+        season_outcomes: list[list[int]] = []
+
         # initial match date should be just prior to start of season
         match_date: date = db.get_season_dates(competition_id, season)[0] - timedelta(
             days=1
@@ -339,6 +1009,8 @@ def run_seasons(
                         },
                         AVG_BASE,
                         HOME_ADVANTAGE,
+                        seed=sim_seed if variance_reduction else sim_seed.spawn(1)[0],
+                        variance_reduction=variance_reduction,
                     )
                     for cid in results:
                         projections.append(
@@ -365,21 +1037,33 @@ def run_seasons(
 
             off_1 = compute_rating(clubs_map[club_id_1].mp_off)
             def_1 = compute_rating(clubs_map[club_id_1].mp_def)
-            efi_1 = compute_efi(off_1, def_1)
+            efi_1 = clubs_map[club_id_1].efi[-1]
 
             off_2 = compute_rating(clubs_map[club_id_2].mp_off)
             def_2 = compute_rating(clubs_map[club_id_2].mp_def)
-            efi_2 = compute_efi(off_2, def_2)
-
-            proj_1 = compute_projected_goals(
-                (clubs_map[club_id_1].mp_off), def_2, True, AVG_BASE, HOME_ADVANTAGE
-            )
-            proj_2 = compute_projected_goals(
-                (clubs_map[club_id_2].mp_off), def_1, False, AVG_BASE, HOME_ADVANTAGE
+            efi_2 = clubs_map[club_id_2].efi[-1]
+
+            # probabilities are computed for all of this season's matches at
+            # once, after the last match
+            season_proj_goals.append(
+                (
+                    compute_projected_goals(
+                        clubs_map[club_id_1].mp_off,
+                        def_2,
+                        True,
+                        AVG_BASE,
+                        HOME_ADVANTAGE,
+                    ),
+                    compute_projected_goals(
+                        clubs_map[club_id_2].mp_off,
+                        def_1,
+                        False,
+                        AVG_BASE,
+                        HOME_ADVANTAGE,
+                    ),
+                )
             )
 
-            prob_1, prob_2, prob_d = compute_probs(proj_1, proj_2)
-
             if m.ag_1 is None or m.ag_2 is None or m.xg_1 is None or m.xg_2 is None:
                 raise Exception(f"Match with id {m.id} is missing ag or xg stats.")
 
@@ -416,25 +1100,19 @@ def run_seasons(
                 HOME_ADVANTAGE,
             )
 
-            # update model performance
             if m.score_1 is None or m.score_2 is None:
                 raise Exception(f"Match with id {m.id} is missing scores.")
-            probs = [prob_1, prob_d, prob_2]
-            outcome = (
+            season_outcomes.append(
                 [1, 0, 0]
                 if m.score_1 > m.score_2
                 else [0, 0, 1] if m.score_1 < m.score_2 else [0, 1, 0]
             )
-            P.rps += scoring.compute_rps(probs, outcome)
-            P.ign += scoring.compute_ign(probs, outcome)
-            P.bs += scoring.compute_bs(probs, outcome)
-            P.mp += 1
 
             # update clubs map
-            clubs_map[club_id_1].mp_off.appendleft(mp_off_1)
-            clubs_map[club_id_1].mp_def.appendleft(mp_def_1)
-            clubs_map[club_id_2].mp_off.appendleft(mp_off_2)
-            clubs_map[club_id_2].mp_def.appendleft(mp_def_2)
+            clubs_map[club_id_1].mp_off.push(mp_off_1)
+            clubs_map[club_id_1].mp_def.push(mp_def_1)
+            clubs_map[club_id_2].mp_off.push(mp_off_2)
+            clubs_map[club_id_2].mp_def.push(mp_def_2)
 
             clubs_map[club_id_1].efi.append(
                 compute_efi(
@@ -449,7 +1127,7 @@ def run_seasons(
                 )
             )
 
-            match_predictions_performances.append(
+            season_predictions_performances.append(
                 Match(
                     competition_id=m.competition_id,
                     season=m.season,
@@ -465,9 +1143,6 @@ def run_seasons(
                     off_2=off_2,
                     def_2=def_2,
                     efi_2=efi_2,
-                    prob_1=prob_1,
-                    prob_2=prob_2,
-                    prob_d=prob_d,
                     mp_off_1=mp_off_1,
                     mp_def_1=mp_def_1,
                     mp_off_2=mp_off_2,
@@ -503,10 +1178,33 @@ def run_seasons(
                     score,
                     opp_score,
                     points_modification,
+                    clubs_map[club_id].efi[-1],
                 )
                 table_map[club_id] = t
                 history.append(t)
 
+        if season_predictions_performances:
+            probs_1, probs_2, probs_d = compute_outcome_probs(
+                *np.array(season_proj_goals).T
+            )
+            for pm, outcome, prob_1, prob_2, prob_d in zip(
+                season_predictions_performances,
+                season_outcomes,
+                probs_1.tolist(),
+                probs_2.tolist(),
+                probs_d.tolist(),
+            ):
+                pm.prob_1 = prob_1
+                pm.prob_2 = prob_2
+                pm.prob_d = prob_d
+
+                # update model performance
+                probs = [prob_1, prob_d, prob_2]
+                P.rps += scoring.compute_rps(probs, outcome)
+                P.ign += scoring.compute_ign(probs, outcome)
+                P.bs += scoring.compute_bs(probs, outcome)
+                P.mp += 1
+
         if sim:
             sim_date: date = match_date + timedelta(days=1)
             print(season, current_matchweek, match_date)
@@ -524,6 +1222,8 @@ def run_seasons(
                 },
                 AVG_BASE,
                 HOME_ADVANTAGE,
+                seed=sim_seed if variance_reduction else sim_seed.spawn(1)[0],
+                variance_reduction=variance_reduction,
             )
             for cid in results:
                 projections.append(
@@ -545,9 +1245,7 @@ def run_seasons(
             k: v
             for k, v in sorted(
                 clubs_map.items(),
-                key=lambda item: compute_efi(
-                    compute_rating(item[1].mp_off), compute_rating(item[1].mp_def)
-                ),
+                key=lambda item: item[1].efi[-1],
                 reverse=True,
             )
         }
@@ -555,23 +1253,40 @@ def run_seasons(
         for k, v in sorted_clubs_map.items():
             print(
                 v.name,
-                compute_efi(compute_rating(v.mp_off), compute_rating(v.mp_def)),
+                v.efi[-1],
                 table_map[k].pts,
                 table_map[k].gd,
             )
         print()
 
+        if save:
+            with db.transaction():
+                db.update_matches_predictions(season_predictions_performances)
+                db.update_matches_performances(season_predictions_performances)
+                db.upsert_history(history)
+                db.upsert_projections(projections)
+                db.rebuild_club_state(competition_id, season)
+            save_checkpoint(
+                RunCheckpoint(
+                    competition_id=competition_id,
+                    start=start,
+                    season=season + 1,
+                    table_map=table_map,
+                    performance=P,
+                    sim_seed_entropy=sim_seed.entropy,  # type: ignore
+                    sim_seeds_spawned=sim_seed.n_children_spawned,
+                )
+            )
+
     if performance:
         print(f"Model performance ({P.mp} matches):")
         print("avg rps:", P.rps / P.mp)
         print("avg ign:", P.ign / P.mp)
         print("avg bs:", P.bs / P.mp)
 
-    if save:
-        db.update_matches_predictions(match_predictions_performances)
-        db.update_matches_performances(match_predictions_performances)
-        db.upsert_history(history)
-        db.upsert_projections(projections)
+    # all seasons are saved, so there is nothing left to resume
+    if save and os.path.exists(get_checkpoint_path(competition_id)):
+        os.remove(get_checkpoint_path(competition_id))
 
 
 def construct_new_table_snapshot(
@@ -583,6 +1298,7 @@ def construct_new_table_snapshot(
     score: int,
     opp_score: int,
     points_mod: int,
+    efi: float | None = None,
 ) -> TableSnapshot:
     """Constructs club's new TableSnapshot based on old TableSnapshot.
 
@@ -598,6 +1314,8 @@ def construct_new_table_snapshot(
         opp_score (int): club's goals conceded in latest match
         points_mod (int): points modification to match result (in case of
             deduction or addition)
+        efi (float | None, optional): club's EFI after latest match, if already
+            computed. Defaults to None (computed from club_snapshot).
 
     Returns:
         TableSnapshot: new TableSnapshot taking into account club's latest match
@@ -610,17 +1328,17 @@ def construct_new_table_snapshot(
         new_form = old_snapshot.form[:]
         new_form[none_ind] = res
 
+    off = compute_rating(club_snapshot.mp_off)
+    def_ = compute_rating(club_snapshot.mp_def)
+
     return TableSnapshot(
         competition_id=competition_id,
         season=season,
         club_id=old_snapshot.club_id,
         match_id=match_id,
-        off=compute_rating(club_snapshot.mp_off),
-        def_=compute_rating(club_snapshot.mp_def),
-        efi=compute_efi(
-            compute_rating(club_snapshot.mp_off),
-            compute_rating(club_snapshot.mp_def),
-        ),
+        off=off,
+        def_=def_,
+        efi=efi if efi is not None else compute_efi(off, def_),
         form=new_form,
         mp=old_snapshot.mp + 1,
         w=old_snapshot.w + (1 if res == "W" else 0),
@@ -635,22 +1353,21 @@ def construct_new_table_snapshot(
     )
 
 
-def compute_rating(mps: deque[float]) -> float:
+def compute_rating(mps: RatingWindow) -> float:
     """Computes offensive or defensive rating from recent match performances.
 
     Args:
-        mps (deque[float]): previous 25 offensive or defensive match
+        mps (RatingWindow): previous 25 offensive or defensive match
             performances
 
     Returns:
         float: offensive or defensive rating
     """
-    rf = list(np.linspace(1, 0, 25, endpoint=False))
-    return sum([a * b for a, b in zip(mps, rf)]) / sum(rf[: len(mps)])
+    return mps.rating
 
 
 def compute_projected_goals(
-    mps: deque[float],
+    mps: RatingWindow,
     opp_def_rating: float,
     home: bool,
     avg_base: float,
@@ -659,7 +1376,7 @@ def compute_projected_goals(
     """Computes goals required to keep offensive rating same.
 
     Args:
-        mps (deque[float]): previous 25 offensive match performances
+        mps (RatingWindow): previous 25 offensive match performances
         opp_def_rating (float): opponent defensive rating
         home (bool): True if computing projected goals for home team
         avg_base (float): avg goals scored per team, per match in this
@@ -670,19 +1387,56 @@ def compute_projected_goals(
     Returns:
         float: projected goals
     """
-    prev_rating = compute_rating(mps)
-    num_mps = min(len(mps) + 1, 25)
-    rf = list(np.linspace(1, 0, 25, endpoint=False))
-    projected_mp = prev_rating * sum(rf[:num_mps]) - sum(
-        [a * b for a, b in zip(mps, rf[1:num_mps])]
+    return float(
+        compute_projected_goals_array(
+            compute_rating(mps),
+            mps.shifted_weighted_sum,
+            len(mps),
+            opp_def_rating,
+            home,
+            avg_base,
+            home_advantage,
+        )
     )
+
+
+def compute_projected_goals_array(
+    ratings: ArrayLike,
+    shifted_weighted_sums: ArrayLike,
+    num_mps: int,
+    opp_def_ratings: ArrayLike,
+    home: bool,
+    avg_base: ArrayLike,
+    home_advantage: ArrayLike,
+) -> np.ndarray:
+    """Computes projected goals for arrays of offensive ratings, such as one
+    club's ratings under several sets of competition parameters.
+
+    Args:
+        ratings (ArrayLike): offensive ratings
+        shifted_weighted_sums (ArrayLike): weighted sums of previous offensive
+            match performances after one more is pushed (see RatingWindow)
+        num_mps (int): number of previous offensive match performances
+        opp_def_ratings (ArrayLike): opponent defensive ratings
+        home (bool): True if computing projected goals for home team
+        avg_base (ArrayLike): avg goals scored per team, per match
+        home_advantage (ArrayLike): avg goals scored above base by home teams
+
+    Returns:
+        np.ndarray: projected goals
+    """
+    ratings = np.asarray(ratings)
+    avg_base = np.asarray(avg_base)
+    home_advantage = np.asarray(home_advantage)
+    num_mps = min(num_mps + 1, RatingWindow.SIZE)
+    projected_mp = ratings * RatingWindow.NORMS[num_mps] - shifted_weighted_sums
     ha = home_advantage if not home else -1 * home_advantage
-    return max(
+    return np.maximum(
         0,
         (projected_mp - ha - avg_base)
-        * (opp_def_rating * 0.424 + 0.548)
+        * (opp_def_ratings * 0.424 + 0.548)
         / (avg_base * 0.424 + 0.548)
-        + opp_def_rating,
+        + opp_def_ratings,
     )
 
 
@@ -710,16 +1464,47 @@ def compute_mp(
     Returns:
         float: match performance
     """
+    return float(
+        compute_mp_array(comp_score, opp_rating, home, off, avg_base, home_advantage)
+    )
+
+
+def compute_mp_array(
+    comp_scores: ArrayLike,
+    opp_ratings: ArrayLike,
+    home: bool,
+    off: bool,
+    avg_base: ArrayLike,
+    home_advantage: ArrayLike,
+) -> np.ndarray:
+    """Computes offensive or defensive match performances for arrays of
+    composite scores and opponent ratings.
+
+    Args:
+        comp_scores (ArrayLike): composite offensive or defensive scores
+        opp_ratings (ArrayLike): opponent defensive or offensive ratings
+        home (bool): True if computing performances for home team, otherwise
+            False
+        off (bool): True if computing offensive performances, otherwise False
+        avg_base (ArrayLike): avg goals scored per team, per match
+        home_advantage (ArrayLike): avg goals scored above base by home teams
+
+    Returns:
+        np.ndarray: match performances
+    """
+    opp_ratings = np.asarray(opp_ratings)
+    avg_base = np.asarray(avg_base)
+    home_advantage = np.asarray(home_advantage)
     ha = (
         home_advantage
         if (home and not off) or (not home and off)
         else -1 * home_advantage
     )
-    return max(
+    return np.maximum(
         0,
         (
-            (comp_score - opp_rating)
-            / (opp_rating * 0.424 + 0.548)
+            (comp_scores - opp_ratings)
+            / (opp_ratings * 0.424 + 0.548)
             * (avg_base * 0.424 + 0.548)
         )
         + avg_base
@@ -740,6 +1525,88 @@ def compute_comp_score(ag: float, xg: float) -> float:
     return (ag + xg) / 2
 
 
+def compute_outcome_probs(
+    mu_1: ArrayLike, mu_2: ArrayLike, lookup: bool = False
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Computes result probabilities for arrays of projected goals.
+
+    Goals scored by each club are independent Poisson, so goal difference is
+    Skellam distributed. All pairs are evaluated in one call.
+
+    With lookup=True, probabilities are bilinearly interpolated from a table
+    precomputed over a grid with spacing PROBS_TABLE_STEP, instead of
+    evaluating skellam.cdf. Since second partial derivatives of each
+    probability are bounded by 2 in magnitude, absolute error is at most
+    PROBS_TABLE_STEP**2 / 2 (5e-5); measured max error over the grid is
+    ~2e-5. Pairs beyond PROBS_TABLE_MAX goals are computed exactly.
+
+    Args:
+        mu_1 (ArrayLike): projected goals scored by club 1
+        mu_2 (ArrayLike): projected goals scored by club 2
+        lookup (bool, optional): if True, use lookup table. Defaults to False.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (prob of club 1 win, prob of
+            club 2 win, prob of draw)
+    """
+    mu_1 = np.where(np.asarray(mu_1, dtype=float) == 0, 0.000000001, mu_1)
+    mu_2 = np.where(np.asarray(mu_2, dtype=float) == 0, 0.000000001, mu_2)
+
+    if lookup:
+        prob_1 = np.empty(np.broadcast(mu_1, mu_2).shape)
+        prob_2 = np.empty(prob_1.shape)
+        mu_1, mu_2 = np.broadcast_arrays(mu_1, mu_2)
+        in_table = (mu_1 <= PROBS_TABLE_MAX) & (mu_2 <= PROBS_TABLE_MAX)
+
+        win_table, loss_table = _get_probs_table()
+        x = mu_1[in_table] / PROBS_TABLE_STEP
+        y = mu_2[in_table] / PROBS_TABLE_STEP
+        i = np.minimum(x.astype(int), len(win_table) - 2)
+        j = np.minimum(y.astype(int), len(win_table) - 2)
+        tx = x - i
+        ty = y - j
+        for out, table in [(prob_1, win_table), (prob_2, loss_table)]:
+            out[in_table] = (
+                table[i, j] * (1 - tx) * (1 - ty)
+                + table[i + 1, j] * tx * (1 - ty)
+                + table[i, j + 1] * (1 - tx) * ty
+                + table[i + 1, j + 1] * tx * ty
+            )
+
+        outside = ~in_table
+        if outside.any():
+            prob_1[outside] = 1 - skellam.cdf(0, mu_1[outside], mu_2[outside])
+            prob_2[outside] = skellam.cdf(-1, mu_1[outside], mu_2[outside])
+    else:
+        prob_1 = 1 - skellam.cdf(0, mu_1, mu_2)
+        prob_2 = skellam.cdf(-1, mu_1, mu_2)
+
+    prob_d = 1 - prob_1 - prob_2
+    return prob_1, prob_2, prob_d
+
+
+def _get_probs_table() -> tuple[np.ndarray, np.ndarray]:
+    """Gets (win, loss) lookup tables for compute_outcome_probs, building them
+    on first use.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (prob of club 1 win, prob of club 2 win),
+            each indexed by (mu_1 / PROBS_TABLE_STEP, mu_2 / PROBS_TABLE_STEP)
+    """
+    global _probs_table
+    if _probs_table is None:
+        grid = np.linspace(
+            0, PROBS_TABLE_MAX, round(PROBS_TABLE_MAX / PROBS_TABLE_STEP) + 1
+        )
+        grid[0] = 0.000000001
+        mu_1, mu_2 = np.meshgrid(grid, grid, indexing="ij")
+        _probs_table = (
+            1 - skellam.cdf(0, mu_1, mu_2),
+            skellam.cdf(-1, mu_1, mu_2),
+        )
+    return _probs_table
+
+
 def compute_probs(
     proj_goals_1: float, proj_goals_2: float
 ) -> tuple[float, float, float]:
@@ -753,14 +1620,28 @@ def compute_probs(
         tuple[float, float, float]: (prob of club 1 win, prob of club 2 win,
             prob of draw)
     """
-    proj_1 = 0.000000001 if proj_goals_1 == 0 else proj_goals_1
-    proj_2 = 0.000000001 if proj_goals_2 == 0 else proj_goals_2
-    prob_1 = 1 - skellam.cdf(0, proj_1, proj_2)
-    prob_2 = skellam.cdf(-1, proj_1, proj_2)
-    prob_d = 1 - prob_1 - prob_2
+    prob_1, prob_2, prob_d = compute_outcome_probs(proj_goals_1, proj_goals_2)
     return float(prob_1), float(prob_2), float(prob_d)
 
 
+def compute_efis(
+    off_ratings: ArrayLike, def_ratings: ArrayLike, lookup: bool = False
+) -> np.ndarray:
+    """Computes EFI for arrays of offensive and defensive ratings.
+
+    Args:
+        off_ratings (ArrayLike): clubs' offensive ratings
+        def_ratings (ArrayLike): clubs' defensive ratings
+        lookup (bool, optional): if True, use lookup table (see
+            compute_outcome_probs). Defaults to False.
+
+    Returns:
+        np.ndarray: clubs' EFI
+    """
+    w_pct, _, d_pct = compute_outcome_probs(off_ratings, def_ratings, lookup)
+    return ((w_pct * 3 + d_pct) / 3) * 100
+
+
 def compute_efi(off_rating: float, def_rating: float) -> float:
     """Computes club's EFI, given their offensive and defensive ratings.
 
@@ -771,10 +1652,7 @@ def compute_efi(off_rating: float, def_rating: float) -> float:
     Returns:
         float: club's EFI
     """
-    w_pct = 1 - skellam.cdf(0, off_rating, def_rating)
-    l_pct = skellam.cdf(-1, off_rating, def_rating)
-    d_pct = 1 - w_pct - l_pct
-    return float(((w_pct * 3 + d_pct) / 3) * 100)
+    return float(compute_efis(off_rating, def_rating))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,74 @@
+"""
+Token-bucket rate limiter shared by scrapers.
+
+Bucket state lives in a small file per limiter name, locked with flock while
+it is read and updated, so every thread and process using a limiter of the
+same name, ex. parallel backfills, draws from one bucket. Requires a POSIX
+system.
+"""
+
+import fcntl
+import os
+import struct
+import tempfile
+import time
+
+RATE_LIMIT_DIR = tempfile.gettempdir()  # bucket state files, named by limiter
+STATE = struct.Struct("dd")  # tokens, and time.time() they were counted at
+
+
+class RateLimiter:
+    def __init__(self, name: str, rate: float, capacity: float = 1):
+        """Token bucket refilling at rate tokens per second, holding up to
+        capacity tokens; each request takes one token.
+
+        Limiters with the same name share one bucket across threads and
+        processes, so they should have the same rate and capacity. Waits are
+        reserved under the file lock but slept outside it, so each caller waits
+        only the time still needed since the previous request started, and time
+        spent parsing the previous response counts towards it.
+
+        Args:
+            name (str): bucket name, ex. "fbref"
+            rate (float): tokens added per second, ex. 1 / 6 for one request
+                every 6 seconds
+            capacity (float, optional): max tokens, i.e. max burst of requests.
+                Defaults to 1.
+        """
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+
+    @property
+    def path(self) -> str:
+        return os.path.join(RATE_LIMIT_DIR, f"efi-ratelimit-{self.name}")
+
+    def reserve(self) -> float:
+        """Takes a token, which may not be available yet.
+
+        Returns:
+            float: seconds to wait before making request
+        """
+        # a new open file per call, since flock locks held through one open
+        # file don't exclude other threads using it
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            state = os.pread(fd, STATE.size, 0)
+            now = time.time()
+            tokens = self.capacity
+            if len(state) == STATE.size:
+                saved, updated = STATE.unpack(state)
+                # wall clock may step back, which must not drain the bucket
+                tokens = min(tokens, saved + max(0.0, now - updated) * self.rate)
+            # may go negative, reserving a token that is not refilled yet
+            tokens -= 1
+            os.pwrite(fd, STATE.pack(tokens, now), 0)
+        finally:
+            # closing releases the lock
+            os.close(fd)
+        return max(0.0, -tokens / self.rate)
+
+    def acquire(self):
+        """Waits until a token is available, then takes it."""
+        time.sleep(self.reserve())
@@ -3,6 +3,7 @@ Functions for evaluating model performance.
 """
 
 import math
+import numpy as np
 
 
 def compute_rps(probs: list[float], outcome: list[int]) -> float:
@@ -57,3 +58,65 @@ def compute_bs(probs: list[float], outcome: list[int]) -> float:
     for i in range(len(outcome)):
         sum_bs += (probs[i] - outcome[i]) ** 2.0
     return sum_bs
+
+
+def compute_outcomes(score_1: np.ndarray, score_2: np.ndarray) -> np.ndarray:
+    """Computes one-hot match results for many matches at once.
+
+    Args:
+        score_1 (np.ndarray): N home scores
+        score_2 (np.ndarray): N away scores
+
+    Returns:
+        np.ndarray: N x 3 one-hot representations of match results, rows as in
+            compute_rps
+    """
+    return np.stack(
+        [score_1 > score_2, score_1 == score_2, score_1 < score_2], axis=1
+    ).astype(float)
+
+
+def compute_rps_array(probs: np.ndarray, outcomes: np.ndarray) -> np.ndarray:
+    """Computes ranked probability scores for many matches at once.
+
+    Args:
+        probs (np.ndarray): N x 3 projected match probabilities, rows of
+            [prob_1, prob_d, prob_2]
+        outcomes (np.ndarray): N x 3 one-hot representations of actual match
+            results, rows as in compute_rps
+
+    Returns:
+        np.ndarray: N ranked probability scores (range: 0 to 1)
+    """
+    cum_diffs = np.cumsum(probs - outcomes, axis=1)
+    return np.sum(cum_diffs**2, axis=1) / (probs.shape[1] - 1)
+
+
+def compute_ign_array(probs: np.ndarray, outcomes: np.ndarray) -> np.ndarray:
+    """Computes ignorance scores for many matches at once.
+
+    Args:
+        probs (np.ndarray): N x 3 projected match probabilities, rows of
+            [prob_1, prob_d, prob_2]
+        outcomes (np.ndarray): N x 3 one-hot representations of actual match
+            results, rows as in compute_rps
+
+    Returns:
+        np.ndarray: N ignorance scores (range: 0 to infinity)
+    """
+    return -np.log2(np.sum(probs * outcomes, axis=1))
+
+
+def compute_bs_array(probs: np.ndarray, outcomes: np.ndarray) -> np.ndarray:
+    """Computes Brier scores for many matches at once.
+
+    Args:
+        probs (np.ndarray): N x 3 projected match probabilities, rows of
+            [prob_1, prob_d, prob_2]
+        outcomes (np.ndarray): N x 3 one-hot representations of actual match
+            results, rows as in compute_rps
+
+    Returns:
+        np.ndarray: N Brier scores (range: 0 to 2)
+    """
+    return np.sum((probs - outcomes) ** 2, axis=1)
@@ -2,33 +2,82 @@
 Classes to scrape and retrieve data.
 """
 
+import aiohttp
+import asyncio
+import json
 import pandas as pd
 import re
 import requests
-import time
-from . import db
-from .data import Match, TransferValue, Event, Club_Competition, IdType
+import threading
+from . import cache, db
+from .data import (
+    Match,
+    TransferValue,
+    Event,
+    Club,
+    Club_Competition,
+    Competition,
+    IdType,
+)
+from .ratelimit import RateLimiter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal, ROUND_HALF_UP
 from lxml import html
+from requests.adapters import HTTPAdapter
 
 
 HEADERS = {
     "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
 }
+FOTMOB_URL = "https://www.fotmob.com"  # FotMob API base url
+FOTMOB_HEADERS_URL = "http://46.101.91.154:6006/"  # serves FotMob auth headers
+FOTMOB_CONCURRENCY = 8  # max FotMob requests in flight in batch methods
+FOTMOB_REQUESTS_PER_SECOND = 5.0  # max FotMob request rate in batch methods
+FBREF_INTERVAL = 6  # min seconds between FBref requests, per FBref's limits
+TRANSFERMARKT_URL = "https://www.transfermarkt.us"  # Transfermarkt base url
+TRANSFERMARKT_CONCURRENCY = 10  # max Transfermarkt requests in flight
+TRANSFERMARKT_REQUESTS_PER_SECOND = 10.0  # max Transfermarkt request rate
 
 
 class Transfermarkt:
     UNIT_CONVERSION = {"k": 1000, "m": 1000000, "bn": 1000000000}
-
-    def __init__(self):
-        pass
+    # shared by all instances, threads, and processes
+    limiter = RateLimiter(
+        "transfermarkt",
+        TRANSFERMARKT_REQUESTS_PER_SECOND,
+        capacity=TRANSFERMARKT_CONCURRENCY,
+    )
+
+    def __init__(
+        self,
+        base_url: str = TRANSFERMARKT_URL,
+        concurrency: int = TRANSFERMARKT_CONCURRENCY,
+    ):
+        """
+        Args:
+            base_url (str, optional): Transfermarkt base url, ex. a local
+                server for testing. Defaults to TRANSFERMARKT_URL.
+            concurrency (int, optional): max requests in flight. Defaults to
+                TRANSFERMARKT_CONCURRENCY.
+        """
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        # keep a connection open per worker thread
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
     def get_transfer_values(
         self, competition_id: int, season: int
     ) -> list[TransferValue]:
         """Scrapes each club's transfer values at beginning of given competition and season.
 
+        Clubs' squad pages are fetched and parsed concurrently, sharing
+        Transfermarkt's rate limit.
+
         Args:
             competition_id (int): competition's db id, ex. 1 for Premier League
             season (int): earlier year of season (ex. 2016 means 2016/17)
@@ -37,50 +86,91 @@ class Transfermarkt:
             list[TransferValue]: list of TransferValue, to be inserted into db
         """
         clubs = db.get_clubs(competition_id, season)
-        transfer_values: list[TransferValue] = []
-        for club in clubs:
-            r = requests.get(
-                f"https://www.transfermarkt.us/{club.transfermarkt_path}/kader/verein/{club.transfermarkt_id}/plus/0/galerie/0?saison_id={season - 1}",
-                headers=HEADERS,
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(
+                executor.map(
+                    lambda club: self.__get_transfer_value(club, season), clubs
+                )
             )
-            doc = html.document_fromstring(r.text)
 
-            tv = TransferValue(
-                club_id=club.id,
-                season=season,
-                off_value=Decimal(0),
-                def_value=Decimal(0),
-            )
+    def __get_transfer_value(self, club: Club, season: int) -> TransferValue:
+        """Scrapes club's transfer values at beginning of given season.
 
-            for i, td in enumerate(
-                doc.xpath(
-                    "//span[text()='Squad details by position']/following-sibling::table/tbody//td[@class='rechts'][1]"
-                )
-            ):
-                value = Decimal(re.sub(r"[^\d\.]", "", td.text))
-                match = re.search("k|m|bn", td.text)
-                if match is None:
-                    raise Exception(
-                        f"Unit not recognized in Transfermarkt value ({season-1} {club.name}): {td.text}"
-                    )
-                unit = td.text[match.start() : match.end()]
-                if i < 2:
-                    tv.def_value += value * Decimal(self.UNIT_CONVERSION[unit])
-                else:
-                    tv.off_value += value * Decimal(self.UNIT_CONVERSION[unit])
-            tv.off_value.quantize(Decimal(".01"), ROUND_HALF_UP)
-            tv.def_value.quantize(Decimal(".01"), ROUND_HALF_UP)
-            transfer_values.append(tv)
+        Args:
+            club (Club): club
+            season (int): earlier year of season (ex. 2016 means 2016/17)
+
+        Returns:
+            TransferValue: club's off and def transfer values
+        """
+        r = cache.get(
+            f"{self.base_url}/{club.transfermarkt_path}/kader/verein/{club.transfermarkt_id}/plus/0/galerie/0?saison_id={season - 1}",
+            permanent=cache.is_season_over(season),
+            session=self.session,
+            limiter=Transfermarkt.limiter,
+        )
+        doc = html.document_fromstring(r.text)
 
-        return transfer_values
+        tv = TransferValue(
+            club_id=club.id,
+            season=season,
+            off_value=Decimal(0),
+            def_value=Decimal(0),
+        )
+
+        for i, td in enumerate(
+            doc.xpath(
+                "//span[text()='Squad details by position']/following-sibling::table/tbody//td[@class='rechts'][1]"
+            )
+        ):
+            value = Decimal(re.sub(r"[^\d\.]", "", td.text))
+            match = re.search("k|m|bn", td.text)
+            if match is None:
+                raise Exception(
+                    f"Unit not recognized in Transfermarkt value ({season-1} {club.name}): {td.text}"
+                )
+            unit = td.text[match.start() : match.end()]
+            if i < 2:
+                tv.def_value += value * Decimal(self.UNIT_CONVERSION[unit])
+            else:
+                tv.off_value += value * Decimal(self.UNIT_CONVERSION[unit])
+        tv.off_value.quantize(Decimal(".01"), ROUND_HALF_UP)
+        tv.def_value.quantize(Decimal(".01"), ROUND_HALF_UP)
+        return tv
 
 
 class Fotmob:
-    def __init__(self):
+    # shared by all instances and threads, ex. update_all's workers, so
+    # batches running at once stay within one budget; limiter is also shared
+    # across processes
+    limiter = RateLimiter("fotmob", FOTMOB_REQUESTS_PER_SECOND)
+    slots = threading.BoundedSemaphore(FOTMOB_CONCURRENCY)
+
+    def __init__(
+        self,
+        base_url: str = FOTMOB_URL,
+        headers_url: str | None = FOTMOB_HEADERS_URL,
+    ):
+        """
+        Args:
+            base_url (str, optional): FotMob API base url, ex. a local server
+                for testing. Defaults to FOTMOB_URL.
+            headers_url (str | None, optional): url serving FotMob auth
+                headers, or None to send none. Defaults to FOTMOB_HEADERS_URL.
+        """
+        self.base_url = base_url
+        self.headers = dict(HEADERS)
         self.session = requests.Session()
-        self.session.headers.update(HEADERS)
-        cookie = self.session.get("http://46.101.91.154:6006/")
-        self.session.headers.update(cookie.json())
+        self.session.headers.update(self.headers)
+        if headers_url is not None:
+            cookie = cache.fetch(headers_url, session=self.session)
+            self.headers.update(cookie.json())
+            self.session.headers.update(self.headers)
+        # memoized for this session, keyed by competition id or
+        # (competition id, season)
+        self.__competitions: dict[int, Competition] = {}
+        self.__leagues: dict[tuple[int, int], dict] = {}
+        self.__fotmob_id_to_club: dict[tuple[int, int], dict[str, Club]] = {}
 
     def __fotmob_timestamp_to_datetime(self, timestamp: str) -> datetime:
         """Converts FotMob timestamp string to datetime object.
@@ -103,6 +193,70 @@ class Fotmob:
 
         raise ValueError("Invalid timestamp format")
 
+    def __get_competition(self, competition_id: int) -> Competition:
+        """Gets competition from db, once per session.
+
+        Args:
+            competition_id (int): competition's db id, ex. 1 for Premier League
+
+        Raises:
+            ValueError: Invalid competition id
+
+        Returns:
+            Competition: competition
+        """
+        if competition_id not in self.__competitions:
+            competition = db.get_competition_by_id(competition_id)
+            if competition is None:
+                raise ValueError(
+                    f"Invalid competition id: {competition_id} is not in database"
+                )
+            self.__competitions[competition_id] = competition
+        return self.__competitions[competition_id]
+
+    def __get_league(self, competition_id: int, season: int) -> dict:
+        """Gets FotMob league JSON for given competition and season, once per
+        session. Shared by tables, matches, and season avgs.
+
+        Args:
+            competition_id (int): competition's db id, ex. 1 for Premier League
+            season (int): earlier year of season (ex. 2016 means 2016/17)
+
+        Returns:
+            dict: league JSON
+        """
+        key = (competition_id, season)
+        if key not in self.__leagues:
+            competition = self.__get_competition(competition_id)
+            r = cache.get(
+                f"{self.base_url}/api/leagues?id={competition.fotmob_id}&season={season}/{season+1}",
+                permanent=cache.is_season_over(season),
+                session=self.session,
+            )
+            self.__leagues[key] = r.json()
+        return self.__leagues[key]
+
+    def __get_fotmob_id_to_club(
+        self, competition_id: int, season: int
+    ) -> dict[str, Club]:
+        """Gets FotMob id -> Club for clubs in competition/season from db, once
+        per session.
+
+        Args:
+            competition_id (int): competition's db id, ex. 1 for Premier League
+            season (int): earlier year of season (ex. 2016 means 2016/17)
+
+        Returns:
+            dict[str, Club]: FotMob id -> Club
+        """
+        key = (competition_id, season)
+        # an empty map means clubs aren't linked to competition yet, so re-query
+        if not self.__fotmob_id_to_club.get(key):
+            self.__fotmob_id_to_club[key] = db.get_clubs_by_id_map(
+                IdType.FOTMOB, competition_id, season
+            )
+        return self.__fotmob_id_to_club[key]
+
     def get_clubs_competitions(
         self, competition_id: int, season: int
     ) -> list[Club_Competition]:
@@ -118,19 +272,8 @@ class Fotmob:
         Returns:
             list[Club_Competition]: list of Club_Competition
         """
-        competition = db.get_competition_by_id(competition_id)
-        if competition is None:
-            raise ValueError(
-                f"Invalid competition id: {competition_id} is not in database"
-            )
-        r = self.session.get(
-            f"https://www.fotmob.com/api/leagues?id={competition.fotmob_id}&season={season}/{season+1}"
-        )
-        data = r.json()
-
-        fotmob_id_to_club = db.get_clubs_by_id_map(
-            IdType.FOTMOB, competition_id, season
-        )
+        data = self.__get_league(competition_id, season)
+        fotmob_id_to_club = self.__get_fotmob_id_to_club(competition_id, season)
 
         return [
             Club_Competition(
@@ -153,19 +296,8 @@ class Fotmob:
         Returns:
             dict[int, tuple[float, float]]: club id -> (avg_gs, avg_ga)
         """
-        competition = db.get_competition_by_id(competition_id)
-        if competition is None:
-            raise ValueError(
-                f"Invalid competition id: {competition_id} is not in database"
-            )
-        r = self.session.get(
-            f"https://www.fotmob.com/api/leagues?id={competition.fotmob_id}&season={season}/{season+1}"
-        )
-        data = r.json()
-
-        fotmob_id_to_club = db.get_clubs_by_id_map(
-            IdType.FOTMOB, competition_id, season
-        )
+        data = self.__get_league(competition_id, season)
+        fotmob_id_to_club = self.__get_fotmob_id_to_club(competition_id, season)
         d = {}
         for t in data["table"][0]["data"]["table"]["all"]:
             fotmob_id = str(t["id"])
@@ -178,17 +310,9 @@ class Fotmob:
         return d
 
     def get_home_advantage(self, competition_id: int) -> pd.DataFrame:
-        competition = db.get_competition_by_id(competition_id)
-        if competition is None:
-            raise ValueError(
-                f"Invalid competition id: {competition_id} is not in database"
-            )
         stats = []
         for season in range(2014, 2024):
-            r = self.session.get(
-                f"https://www.fotmob.com/api/leagues?id={competition.fotmob_id}&season={season}/{season+1}"
-            )
-            data = r.json()
+            data = self.__get_league(competition_id, season)
 
             total_home_gs = 0
             total_away_gs = 0
@@ -226,19 +350,8 @@ class Fotmob:
         Returns:
             list[Match]: list of Match with no match stats
         """
-        competition = db.get_competition_by_id(competition_id)
-        if competition is None:
-            raise ValueError(
-                f"Invalid competition id: {competition_id} is not in database"
-            )
-        r = self.session.get(
-            f"https://www.fotmob.com/api/leagues?id={competition.fotmob_id}&season={season}/{season+1}",
-        )
-        data = r.json()
-
-        fotmob_id_to_club = db.get_clubs_by_id_map(
-            IdType.FOTMOB, competition_id, season
-        )
+        data = self.__get_league(competition_id, season)
+        fotmob_id_to_club = self.__get_fotmob_id_to_club(competition_id, season)
 
         return [
             Match(
@@ -258,7 +371,11 @@ class Fotmob:
         ]
 
     def get_completed_match_stats(
-        self, competition_id: int, season: int, fotmob_match_id: str
+        self,
+        competition_id: int,
+        season: int,
+        fotmob_match_id: str,
+        fotmob_id_to_club: dict[str, Club] | None = None,
     ) -> Match:
         """Gets stats from completed match with given FotMob id.
 
@@ -266,6 +383,9 @@ class Fotmob:
             competition_id (int): competition's db id, ex. 1 for Premier League
             season (int): earlier year of season (ex. 2016 means 2016/17)
             fotmob_match_id (str): FotMob match id
+            fotmob_id_to_club (dict[str, Club] | None, optional): FotMob id ->
+                Club for clubs in competition/season, to avoid a db lookup per
+                match. Defaults to None (fetched from db).
 
         Raises:
             ValueError: invalid FotMob id or match not yet completed
@@ -273,11 +393,129 @@ class Fotmob:
         Returns:
             Match: a Match with scores, xg, ag, and events
         """
-        r = self.session.get(
-            f"https://www.fotmob.com/api/matchDetails?matchId={fotmob_match_id}",
+        r = cache.get(
+            f"{self.base_url}/api/matchDetails?matchId={fotmob_match_id}",
+            permanent=True,
+            session=self.session,
+            cacheable=lambda r: self.__is_finished(r.json()),
+        )
+        return self.__parse_completed_match_stats(
+            competition_id, season, fotmob_match_id, r.json(), fotmob_id_to_club
         )
-        data = r.json()
 
+    def get_completed_matches_stats(
+        self,
+        competition_id: int,
+        season: int,
+        fotmob_match_ids: list[str],
+        fotmob_id_to_club: dict[str, Club] | None = None,
+    ) -> list[Match]:
+        """Gets stats from completed matches with given FotMob ids concurrently.
+
+        Requests share one connection pool. Across all instances and threads,
+        at most FOTMOB_CONCURRENCY are in flight and starts are spaced to at
+        most FOTMOB_REQUESTS_PER_SECOND.
+
+        Args:
+            competition_id (int): competition's db id, ex. 1 for Premier League
+            season (int): earlier year of season (ex. 2016 means 2016/17)
+            fotmob_match_ids (list[str]): FotMob match ids
+            fotmob_id_to_club (dict[str, Club] | None, optional): FotMob id ->
+                Club for clubs in competition/season. Defaults to None (fetched
+                from db).
+
+        Raises:
+            ValueError: invalid FotMob id or match not yet completed
+
+        Returns:
+            list[Match]: Matches with scores, xg, ag, and events, in same order
+                as fotmob_match_ids
+        """
+        if fotmob_id_to_club is None:
+            fotmob_id_to_club = self.__get_fotmob_id_to_club(competition_id, season)
+        match_details = asyncio.run(self.__get_match_details_async(fotmob_match_ids))
+        return [
+            self.__parse_completed_match_stats(
+                competition_id, season, fotmob_match_id, data, fotmob_id_to_club
+            )
+            for fotmob_match_id, data in zip(fotmob_match_ids, match_details)
+        ]
+
+    async def __get_match_details_async(self, fotmob_match_ids: list[str]) -> list:
+        """Gets FotMob match details JSON for given match ids concurrently.
+
+        Args:
+            fotmob_match_ids (list[str]): FotMob match ids
+
+        Returns:
+            list: match details JSON, in same order as fotmob_match_ids
+        """
+        async with aiohttp.ClientSession(
+            headers=self.headers,
+            connector=aiohttp.TCPConnector(limit=FOTMOB_CONCURRENCY),
+        ) as session:
+
+            async def get(fotmob_match_id: str):
+                url = f"{self.base_url}/api/matchDetails?matchId={fotmob_match_id}"
+                cached = cache.load(url, permanent=True)
+                if cached is not None:
+                    return cached.json()
+                if cache.get_mode() == cache.REPLAY:
+                    return cache.replay(url).json()
+                # slots is shared with other threads' event loops, so poll it
+                # rather than block this loop
+                while not Fotmob.slots.acquire(blocking=False):
+                    await asyncio.sleep(0.01)
+                try:
+                    await asyncio.sleep(Fotmob.limiter.reserve())
+                    async with session.get(url) as r:
+                        content = await r.read()
+                finally:
+                    Fotmob.slots.release()
+                cache.record(url, r.status, content)
+                data = json.loads(content)
+                if r.ok and self.__is_finished(data):
+                    cache.store(url, content, permanent=True)
+                return data
+
+            return await asyncio.gather(*(get(id) for id in fotmob_match_ids))
+
+    @staticmethod
+    def __is_finished(data: dict) -> bool:
+        """Checks whether FotMob match details JSON is of a completed match.
+
+        Args:
+            data (dict): match details JSON
+
+        Returns:
+            bool: True if match is completed
+        """
+        return "error" not in data and data["general"]["finished"]
+
+    def __parse_completed_match_stats(
+        self,
+        competition_id: int,
+        season: int,
+        fotmob_match_id: str,
+        data: dict,
+        fotmob_id_to_club: dict[str, Club] | None,
+    ) -> Match:
+        """Converts FotMob match details JSON of completed match to Match.
+
+        Args:
+            competition_id (int): competition's db id, ex. 1 for Premier League
+            season (int): earlier year of season (ex. 2016 means 2016/17)
+            fotmob_match_id (str): FotMob match id
+            data (dict): match details JSON
+            fotmob_id_to_club (dict[str, Club] | None): FotMob id -> Club for
+                clubs in competition/season, or None to fetch from db
+
+        Raises:
+            ValueError: invalid FotMob id or match not yet completed
+
+        Returns:
+            Match: a Match with scores, xg, ag, and events
+        """
         if "error" in data:
             raise ValueError(f"Invalid FotMob match id: {fotmob_match_id}")
 
@@ -348,6 +586,9 @@ class Fotmob:
                 sending_offs[e.team] += 1
                 events_string += prefix + "R,"
 
+        if fotmob_id_to_club is None:
+            fotmob_id_to_club = self.__get_fotmob_id_to_club(competition_id, season)
+
         return Match(
             competition_id=competition_id,
             season=season,
@@ -355,8 +596,8 @@ class Fotmob:
             time=time,
             completed=True,
             neutral=False,
-            club_id_1=db.get_club_by_fotmob_id(fotmob_id_1).id,  # type: ignore - returned Club id cannot be None
-            club_id_2=db.get_club_by_fotmob_id(fotmob_id_2).id,  # type: ignore - returned Club id cannot be None
+            club_id_1=fotmob_id_to_club[str(fotmob_id_1)].id,
+            club_id_2=fotmob_id_to_club[str(fotmob_id_2)].id,
             score_1=score_1,
             score_2=score_2,
             xg_1=xg[0],
@@ -369,40 +610,14 @@ class Fotmob:
 
 
 class FBref:
-    def __init__(self):
-        FBref.__timer = datetime.min
-
-    @staticmethod
-    def __reset_timer():
-        FBref.__timer = datetime.now()
+    # shared by all instances, threads, and processes
+    limiter = RateLimiter("fbref", 1 / FBREF_INTERVAL)
 
-    @staticmethod
-    def __check_timer():
-        """Checks time since last scrape, sleeps if < 6 seconds."""
-        if (datetime.now() - FBref.__timer).total_seconds() < 6:
-            time.sleep(6)
-
-    @staticmethod
-    def __time(f):
-        """Wraps timer check and reset around function f.
-
-        Args:
-            f (Any): function to be wrapped
-        """
-
-        def wrapper(*args, **kwargs):
-            FBref.__check_timer()
-            output = f(*args, **kwargs)
-            FBref.__reset_timer()
-            return output
-
-        return wrapper
+    def __init__(self):
+        pass
 
-    def __get(self, url, **kwargs):
-        FBref.__check_timer()
-        r = requests.get(url, **kwargs)
-        FBref.__reset_timer()
-        return r
+    def __get(self, url, permanent: bool = False, **kwargs):
+        return cache.get(url, permanent, limiter=FBref.limiter, **kwargs)
 
     def get_season_avgs(
         self, competition_id: int, season: int
@@ -425,6 +640,7 @@ class FBref:
         res: dict[int, tuple[float, float]] = {}
         r = self.__get(
             f"https://fbref.com/en/comps/{competition.fbref_id}/{season}-{season + 1}",
+            permanent=cache.is_season_over(season),
             timeout=10,
         )
         doc = html.document_fromstring(r.text)
@@ -465,7 +681,8 @@ class FBref:
             )
 
         r = self.__get(
-            f"https://fbref.com/en/comps/{competition.fbref_id}/{season}-{season+1}/schedule/"
+            f"https://fbref.com/en/comps/{competition.fbref_id}/{season}-{season+1}/schedule/",
+            permanent=cache.is_season_over(season),
         )
         doc = html.document_fromstring(r.text)
 
@@ -545,7 +762,8 @@ class FBref:
         Returns:
             Match: Match with scores, xg, ag, events
         """
-        r = self.__get(f"https://fbref.com/en/matches/{fbref_match_id}")
+        # only called for completed matches, whose reports never change
+        r = self.__get(f"https://fbref.com/en/matches/{fbref_match_id}", permanent=True)
         doc = html.document_fromstring(r.text)
 
         events_elements = doc.xpath(
@@ -661,8 +879,9 @@ class PremierLeague:
         dates = db.get_season_dates(1, season)
         start_date = (dates[0] - timedelta(days=1)).strftime("%Y-%m-%d")
         end_date = (dates[1] + timedelta(days=1)).strftime("%Y-%m-%d")
-        r = requests.get(
-            f"https://footballapi.pulselive.com/football/broadcasting-schedule/fixtures?&startDate={start_date}&endDate={end_date}&comps=1&pageSize=1000"
+        r = cache.get(
+            f"https://footballapi.pulselive.com/football/broadcasting-schedule/fixtures?&startDate={start_date}&endDate={end_date}&comps=1&pageSize=1000",
+            permanent=cache.is_season_over(season),
         )
         data = r.json()
 
@@ -7,13 +7,28 @@ Run `python -m src.efi.update` from inside `model/` to perform daily updates.
 import os
 import sys
 import time
-from . import db, model, mongo, scrape
-from .data import Match, Projection, TableSnapshot, ClubSnapshot
+from . import cache, db, model, mongo, scrape
+from .data import (
+    ClubSnapshot,
+    IdType,
+    Match,
+    MatchAlreadyInserted,
+    Projection,
+    SimClubSnapshot,
+    SimTableSnapshot,
+    TableSnapshot,
+)
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta, timezone
 from tqdm import tqdm
 
 
-def run_match_performance(m: Match, avg_base: float, home_advantage: float) -> Match:
+def run_match_performance(
+    m: Match,
+    avg_base: float,
+    home_advantage: float,
+    db_match: MatchAlreadyInserted | None = None,
+) -> Match:
     """Adds match performances to Match m.
 
     Args:
@@ -23,6 +38,8 @@ def run_match_performance(m: Match, avg_base: float, home_advantage: float) -> M
             competition
         home_advantage (float): avg goals scored above base by home teams in
             this competition
+        db_match (MatchAlreadyInserted | None, optional): corresponding db
+            match with predictions. Defaults to None (fetched by FotMob id).
 
     Raises:
         ValueError: passed Match is missing necessary fields
@@ -42,7 +59,8 @@ def run_match_performance(m: Match, avg_base: float, home_advantage: float) -> M
             "Failed to run match performance: passed Match is missing necessary fields"
         )
 
-    db_match = db.get_match_by_fotmob_id(m.fotmob_id)
+    if db_match is None:
+        db_match = db.get_match_by_fotmob_id(m.fotmob_id)
     if db_match is None:
         raise Exception(
             f"Match with FotMob id {m.fotmob_id} does not exist in database"
@@ -94,40 +112,51 @@ def run_match_performance(m: Match, avg_base: float, home_advantage: float) -> M
     return m
 
 
-def update_history(
+def construct_new_history(
     competition_id: int,
     season: int,
     m: Match,
+    match_id: int,
     old_snapshot_1: TableSnapshot,
     old_snapshot_2: TableSnapshot,
-):
-    """Inserts row into History table for each club in Match m.
+    mps: dict[int, SimClubSnapshot],
+) -> list[TableSnapshot]:
+    """Constructs new History rows for each club in Match m.
+
+    Pushes each club's match performances onto its windows in mps.
 
     Args:
         competition_id (int): competition's db id, ex. 1 for Premier League
         season (int): earlier year of season (ex. 2016 means 2016/17)
-        m (Match): match to update History with, scores filled in
+        m (Match): match to update History with, scores and match performances
+            filled in
+        match_id (int): db id of Match m
         old_snapshot_1 (TableSnapshot): club 1's table row prior to Match m
         old_snapshot_2 (TableSnapshot): club 2's table row prior to Match m
+        mps (dict[int, SimClubSnapshot]): club id -> match performances prior
+            to Match m
+
+    Returns:
+        list[TableSnapshot]: club 1's and club 2's new History rows
     """
     if m.score_1 is None or m.score_2 is None:
         raise ValueError("Passed Match is missing score_1 and/or score_2.")
-    if m.fotmob_id is None:
-        raise ValueError("Passed Match is missing fotmob_id")
-    db_match = db.get_match_by_fotmob_id(m.fotmob_id)
-    if db_match is None:
-        raise Exception(
-            f"Match with fotmob_id {m.fotmob_id} does not exist in database"
-        )
-    match_id = db_match.id
+    if (
+        m.mp_off_1 is None
+        or m.mp_def_1 is None
+        or m.mp_off_2 is None
+        or m.mp_def_2 is None
+    ):
+        raise ValueError("Passed Match is missing match performances.")
 
-    mps = db.get_recent_match_performances(competition_id, season)
     new_history: list[TableSnapshot] = []
 
-    for club_id, old_snapshot in [
-        (m.club_id_1, old_snapshot_1),
-        (m.club_id_2, old_snapshot_2),
+    for club_id, old_snapshot, mp_off, mp_def in [
+        (m.club_id_1, old_snapshot_1, m.mp_off_1, m.mp_def_1),
+        (m.club_id_2, old_snapshot_2, m.mp_off_2, m.mp_def_2),
     ]:
+        mps[club_id].mp_off.push(mp_off)
+        mps[club_id].mp_def.push(mp_def)
         club_snapshot = ClubSnapshot(
             name="", mp_off=mps[club_id].mp_off, mp_def=mps[club_id].mp_def, efi=[]
         )
@@ -147,7 +176,7 @@ def update_history(
         )
         new_history.append(t)
 
-    db.upsert_history(new_history)
+    return new_history
 
 
 def update_predictions(
@@ -172,48 +201,54 @@ def update_predictions(
     # get up to 25 most recent match performances for each team
     mps = db.get_recent_match_performances(competition_id, season)
 
-    predicted_matches: list[Match] = []
-    # may overlap with existing predictions, but that's okay - will just
-    # overwrite same values
-
-    for m in matches:
-        off_1 = model.compute_rating(mps[m.club_id_1].mp_off)
-        def_1 = model.compute_rating(mps[m.club_id_1].mp_def)
-        efi_1 = model.compute_efi(off_1, def_1)
-
-        off_2 = model.compute_rating(mps[m.club_id_2].mp_off)
-        def_2 = model.compute_rating(mps[m.club_id_2].mp_def)
-        efi_2 = model.compute_efi(off_2, def_2)
-
-        proj_1 = model.compute_projected_goals(
-            mps[m.club_id_1].mp_off, def_2, True, avg_base, home_advantage
+    off_1 = [model.compute_rating(mps[m.club_id_1].mp_off) for m in matches]
+    def_1 = [model.compute_rating(mps[m.club_id_1].mp_def) for m in matches]
+    off_2 = [model.compute_rating(mps[m.club_id_2].mp_off) for m in matches]
+    def_2 = [model.compute_rating(mps[m.club_id_2].mp_def) for m in matches]
+    proj_1 = [
+        model.compute_projected_goals(
+            mps[m.club_id_1].mp_off, def_2[i], True, avg_base, home_advantage
         )
-        proj_2 = model.compute_projected_goals(
-            mps[m.club_id_2].mp_off, def_1, False, avg_base, home_advantage
+        for i, m in enumerate(matches)
+    ]
+    proj_2 = [
+        model.compute_projected_goals(
+            mps[m.club_id_2].mp_off, def_1[i], False, avg_base, home_advantage
         )
-        prob_1, prob_2, prob_d = model.compute_probs(proj_1, proj_2)
-
-        predicted_matches.append(
-            Match(
-                competition_id=competition_id,
-                season=season,
-                matchweek=m.matchweek,
-                time=m.time,
-                club_id_1=m.club_id_1,
-                club_id_2=m.club_id_2,
-                completed=m.completed,
-                neutral=m.neutral,
-                off_1=off_1,
-                def_1=def_1,
-                efi_1=efi_1,
-                off_2=off_2,
-                def_2=def_2,
-                efi_2=efi_2,
-                prob_1=prob_1,
-                prob_2=prob_2,
-                prob_d=prob_d,
-            )
+        for i, m in enumerate(matches)
+    ]
+
+    # score all upcoming matches in one call each
+    efi_1 = model.compute_efis(off_1, def_1).tolist()
+    efi_2 = model.compute_efis(off_2, def_2).tolist()
+    prob_1, prob_2, prob_d = [
+        p.tolist() for p in model.compute_outcome_probs(proj_1, proj_2)
+    ]
+
+    # may overlap with existing predictions, but that's okay - will just
+    # overwrite same values
+    predicted_matches: list[Match] = [
+        Match(
+            competition_id=competition_id,
+            season=season,
+            matchweek=m.matchweek,
+            time=m.time,
+            club_id_1=m.club_id_1,
+            club_id_2=m.club_id_2,
+            completed=m.completed,
+            neutral=m.neutral,
+            off_1=off_1[i],
+            def_1=def_1[i],
+            efi_1=efi_1[i],
+            off_2=off_2[i],
+            def_2=def_2[i],
+            efi_2=efi_2[i],
+            prob_1=prob_1[i],
+            prob_2=prob_2[i],
+            prob_d=prob_d[i],
         )
+        for i, m in enumerate(matches)
+    ]
 
     print(f"Updating {len(predicted_matches)} matches with predictions...")
     db.update_matches_predictions(predicted_matches)
@@ -307,9 +342,29 @@ def update(competition_id: int, season: int) -> int:
 
     print(f"Updating stats for {len(new_completed_matches)} matches:")
 
+    # Fetch db rows, table rows, and match performances up front; matches are
+    # processed in memory and written back in one transaction
+    new_completed_fotmob_ids = [
+        m.fotmob_id for m in new_completed_matches if m.fotmob_id is not None
+    ]
+    db_matches = db.get_matches_by_fotmob_ids(new_completed_fotmob_ids)
+    fotmob_id_to_club = db.get_clubs_by_id_map(IdType.FOTMOB, competition_id, season)
+
+    # fetch match stats concurrently
+    match_stats = {
+        m.fotmob_id: m
+        for m in F.get_completed_matches_stats(
+            competition_id, season, new_completed_fotmob_ids, fotmob_id_to_club
+        )
+    }
+    table = db.get_history_latest_table_snapshots(competition_id, season)
+    mps = db.get_recent_match_performances(competition_id, season)
+
     current_matchweek = None
     current_match_date = None
     projections: list[Projection] = []
+    updated_matches: list[Match] = []
+    new_history: list[TableSnapshot] = []
 
     for m in tqdm(new_completed_matches):
         # Update end-of-season projections if we've advanced a matchweek within
@@ -326,18 +381,22 @@ def update(competition_id: int, season: int) -> int:
                 current_match_date,
             )
             sim_date: date = current_match_date + timedelta(days=1)
-            table_map = db.get_history_latest_sim_table_snapshots(
-                competition_id, season
-            )
-            clubs_map = db.get_recent_match_performances(competition_id, season)
+            table_map = {
+                cid: SimTableSnapshot(cid, t.gf, t.gd, t.pts)
+                for cid, t in table.items()
+            }
             results = model.sim_from_date(
                 competition_id,
                 season,
                 sim_date,
                 table_map,
-                clubs_map,
+                mps,
                 AVG_BASE,
                 HOME_ADVANTAGE,
+                seed=[competition_id, season],
+                tolerance=model.SIM_TOLERANCE,
+                pts_tolerance=model.SIM_PTS_TOLERANCE,
+                variance_reduction=True,
             )
             for cid in results:
                 projections.append(
@@ -359,7 +418,7 @@ def update(competition_id: int, season: int) -> int:
             raise Exception("FotMob match in new_completed_matches has no id:", m)
 
         # Get corresponding match in db
-        db_m = db.get_match_by_fotmob_id(m.fotmob_id)
+        db_m = db_matches.get(m.fotmob_id)
         if db_m is None:
             raise Exception(
                 "FotMob match in new_completed_matches does not have corresponding match in database:",
@@ -371,21 +430,25 @@ def update(competition_id: int, season: int) -> int:
         # add match performance to Match
         # update stats, performance, and history
         updated_match = run_match_performance(
-            F.get_completed_match_stats(competition_id, season, m.fotmob_id),
+            match_stats[m.fotmob_id],
             AVG_BASE,
             HOME_ADVANTAGE,
+            db_m,
         )
+        updated_matches.append(updated_match)
 
-        old_snapshots: list[TableSnapshot] = []
-        for club_id in [updated_match.club_id_1, updated_match.club_id_2]:
-            old_snapshots.append(
-                db.get_history_latest_table_snapshot(club_id, competition_id, season)
-            )
-
-        # mark match as completed and write stats, match performances
-        db.update_matches_stats([updated_match])
-        db.update_matches_performances([updated_match])
-        update_history(competition_id, season, updated_match, *old_snapshots)
+        snapshots = construct_new_history(
+            competition_id,
+            season,
+            updated_match,
+            db_m.id,
+            table[updated_match.club_id_1],
+            table[updated_match.club_id_2],
+            mps,
+        )
+        for t in snapshots:
+            table[t.club_id] = t
+        new_history.extend(snapshots)
 
         current_matchweek = db_m.display_with_matchweek
         current_match_date = m.time.date()
@@ -403,16 +466,21 @@ def update(competition_id: int, season: int) -> int:
             current_match_date,
         )
         sim_date: date = current_match_date + timedelta(days=1)
-        table_map = db.get_history_latest_sim_table_snapshots(competition_id, season)
-        clubs_map = db.get_recent_match_performances(competition_id, season)
+        table_map = {
+            cid: SimTableSnapshot(cid, t.gf, t.gd, t.pts) for cid, t in table.items()
+        }
         results = model.sim_from_date(
             competition_id,
             season,
             sim_date,
             table_map,
-            clubs_map,
+            mps,
             AVG_BASE,
             HOME_ADVANTAGE,
+            seed=[competition_id, season],
+            tolerance=model.SIM_TOLERANCE,
+            pts_tolerance=model.SIM_PTS_TOLERANCE,
+            variance_reduction=True,
         )
         for cid in results:
             projections.append(
@@ -431,8 +499,16 @@ def update(competition_id: int, season: int) -> int:
             )
 
     if new_completed_matches:
+        # mark matches as completed and write stats, match performances,
+        # history, and projections
         print(f"Upserting {len(projections)} projections...")
-        db.upsert_projections(projections)
+        updated_club_ids = {t.club_id for t in new_history}
+        with db.transaction():
+            db.update_matches_stats(updated_matches)
+            db.update_matches_performances(updated_matches)
+            db.upsert_history(new_history)
+            db.upsert_club_state([table[cid] for cid in updated_club_ids], mps)
+            db.upsert_projections(projections)
 
         print("Updating predictions for upcoming matches...")
         update_predictions(competition_id, season, AVG_BASE, HOME_ADVANTAGE)
@@ -443,6 +519,41 @@ def update(competition_id: int, season: int) -> int:
     return len(new_completed_matches)
 
 
+def update_all(competition_ids: list[int], season: int) -> dict[int, int]:
+    """Updates databases with newly completed matches in several competitions
+    concurrently.
+
+    Each competition is updated in its own thread, so scraping and MongoDB
+    writes overlap, and simulations from all competitions share model's worker
+    pool. DuckDB allows a single writer, so db calls are serialized through the
+    shared connection, with each competition's results written in one
+    transaction. The connection is closed once all competitions are done.
+
+    Args:
+        competition_ids (list[int]): competitions' db ids, ex. [1, 2]
+        season (int): earlier year of season (ex. 2016 means 2016/17)
+
+    Returns:
+        dict[int, int]: competition id -> number of newly completed matches
+
+    Raises:
+        Exception: first exception raised by a competition's update, once all
+            competitions have finished
+    """
+    # start simulation workers before any threads, so they aren't forked while
+    # a thread holds a lock
+    model.get_sim_pool()
+    with ThreadPoolExecutor(max_workers=len(competition_ids)) as executor:
+        futures = {
+            competition_id: executor.submit(update, competition_id, season)
+            for competition_id in competition_ids
+        }
+    # release lock on db file, so other tools can open it
+    db.close()
+    print(cache.format_stats())
+    return {competition_id: f.result() for competition_id, f in futures.items()}
+
+
 if __name__ == "__main__":
     try:
         start = time.time()
@@ -451,8 +562,7 @@ if __name__ == "__main__":
             sys.stdout = nullfile
             sys.stderr = nullfile
         log_new_matches = ""
-        for competition_id in range(1, 6):
-            new_matches = update(competition_id, 2024)
+        for competition_id, new_matches in update_all(list(range(1, 6)), 2024).items():
             log_new_matches += f"{competition_id}:{new_matches},"
         end = time.time()
         elapsed = int(end - start)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# run tests against efi in src, without installing it
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
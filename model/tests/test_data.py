@@ -0,0 +1,59 @@
+"""
+Tests of RatingWindow against the deque and linspace rating formula it replaced.
+"""
+
+import numpy as np
+import pytest
+from collections import deque
+from efi.data import RatingWindow
+
+
+def deque_rating(mps: deque[float]) -> float:
+    # compute_rating before RatingWindow, with mps most recent first
+    rf = list(np.linspace(1, 0, 25, endpoint=False))
+    return sum([a * b for a, b in zip(mps, rf)]) / sum(rf[: len(mps)])
+
+
+def test_push_matches_deque_through_wrap_around():
+    rng = np.random.default_rng(0)
+    window = RatingWindow()
+    mps: deque[float] = deque(maxlen=RatingWindow.SIZE)
+    # several full rotations, so the ring buffer wraps and sums are recomputed
+    for mp in rng.uniform(0, 3, 4 * RatingWindow.SIZE + 7):
+        window.push(mp)
+        mps.appendleft(mp)
+        assert list(window) == list(mps)
+        assert window.rating == pytest.approx(deque_rating(mps), rel=1e-12)
+
+
+def test_init_matches_pushes():
+    values = list(np.random.default_rng(1).uniform(0, 3, 30))
+    window = RatingWindow(values)
+    assert list(window) == values[: RatingWindow.SIZE]
+    assert window.rating == pytest.approx(deque_rating(deque(values[:25])), rel=1e-12)
+
+
+def test_sums_do_not_drift():
+    rng = np.random.default_rng(2)
+    window = RatingWindow()
+    # large, varied magnitudes make running sums lose precision quickly
+    for mp in rng.uniform(0, 1e6, 100_000) * rng.choice([1e-6, 1], 100_000):
+        window.push(mp)
+    assert window.sum == pytest.approx(sum(window), rel=1e-12)
+    assert window.rating == pytest.approx(deque_rating(deque(window)), rel=1e-12)
+
+
+def test_copy_is_independent():
+    window = RatingWindow([1.0, 2.0, 3.0])
+    copy = window.copy()
+    copy.push(4.0)
+    assert list(window) == [1.0, 2.0, 3.0]
+    assert list(copy) == [4.0, 1.0, 2.0, 3.0]
+    assert window.rating == pytest.approx(deque_rating(deque([1.0, 2.0, 3.0])))
+
+
+def test_shifted_weighted_sum():
+    window = RatingWindow(np.random.default_rng(3).uniform(0, 3, 10))
+    pushed = window.copy()
+    pushed.push(0.0)
+    assert window.shifted_weighted_sum == pytest.approx(pushed.weighted_sum)
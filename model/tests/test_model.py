@@ -0,0 +1,206 @@
+"""
+Tests of the batched season simulator.
+"""
+
+import itertools
+import numpy as np
+import pytest
+from datetime import date
+from efi import model
+from efi.data import RatingWindow, SimClubSnapshot, SimTableSnapshot
+from types import SimpleNamespace
+
+AVG_BASE = 1.38
+HOME_ADVANTAGE = 0.15
+
+
+@pytest.fixture
+def league() -> tuple[
+    dict[int, SimTableSnapshot],
+    dict[int, SimClubSnapshot],
+    list[tuple[int, int, int]],
+]:
+    """Six clubs partway through a season, with ten remaining matches.
+
+    Returns:
+        tuple: (table_map, clubs_map, matches as (club_id_1, club_id_2, match
+            id))
+    """
+    rng = np.random.default_rng(0)
+    club_ids = [11, 12, 13, 14, 15, 16]
+    table_map = {
+        cid: SimTableSnapshot(
+            club_id=cid,
+            gf=int(rng.integers(10, 30)),
+            gd=int(rng.integers(-10, 10)),
+            pts=int(rng.integers(10, 30)),
+        )
+        for cid in club_ids
+    }
+    clubs_map = {
+        cid: SimClubSnapshot(
+            mp_off=RatingWindow(rng.uniform(0.8, 2.0, 20)),
+            mp_def=RatingWindow(rng.uniform(0.8, 2.0, 20)),
+        )
+        for cid in club_ids
+    }
+    pairs = [(a, b) for a in club_ids for b in club_ids if a != b]
+    matches = [
+        (*pairs[k], 100 + i)
+        for i, k in enumerate(rng.choice(len(pairs), 10, replace=False))
+    ]
+    return table_map, clubs_map, matches
+
+
+def run_batch(
+    tmp_path,
+    league: tuple,
+    simulations: int,
+    seed: int = 0,
+    variance_reduction: bool = False,
+) -> np.ndarray:
+    table_map, clubs_map, matches = league
+    path = str(tmp_path / "inputs")
+    model.pack_sim_inputs(
+        table_map, clubs_map, matches, AVG_BASE, HOME_ADVANTAGE
+    ).tofile(path)
+    return model.sim_batch(
+        (path, simulations, np.random.SeedSequence(seed), variance_reduction)
+    )
+
+
+@pytest.mark.parametrize("variance_reduction", [False, True])
+def test_sim_batch_positions_are_probabilities(tmp_path, league, variance_reduction):
+    n = len(league[0])
+    totals = run_batch(tmp_path, league, 1001, variance_reduction=variance_reduction)
+
+    assert totals.shape == (n, n + 3)
+    probs = totals[:, :n] / 1001
+    # each club finishes somewhere, and each position is taken by one club
+    np.testing.assert_allclose(probs.sum(axis=1), 1)
+    np.testing.assert_allclose(probs.sum(axis=0), 1)
+
+
+def test_sim_batch_is_reproducible(tmp_path, league):
+    a = run_batch(tmp_path, league, 500, seed=1)
+    b = run_batch(tmp_path, league, 500, seed=1)
+    c = run_batch(tmp_path, league, 500, seed=2)
+
+    np.testing.assert_array_equal(a, b)
+    assert not np.array_equal(a, c)
+
+
+def test_sim_batch_pts_match_outcome_probs(tmp_path, league):
+    table_map, clubs_map, matches = league
+    simulations = 20000
+    totals = run_batch(tmp_path, (table_map, clubs_map, matches[:1]), simulations)
+
+    c1, c2, _ = matches[0]
+    mu_1 = model.compute_projected_goals(
+        clubs_map[c1].mp_off,
+        model.compute_rating(clubs_map[c2].mp_def),
+        True,
+        AVG_BASE,
+        HOME_ADVANTAGE,
+    )
+    mu_2 = model.compute_projected_goals(
+        clubs_map[c2].mp_off,
+        model.compute_rating(clubs_map[c1].mp_def),
+        False,
+        AVG_BASE,
+        HOME_ADVANTAGE,
+    )
+    prob_1, prob_2, prob_d = model.compute_outcome_probs(mu_1, mu_2)
+    club_ids = list(table_map.keys())
+    n = len(club_ids)
+    for cid, exp_pts in ((c1, 3 * prob_1 + prob_d), (c2, 3 * prob_2 + prob_d)):
+        avg_pts = totals[club_ids.index(cid), n] / simulations - table_map[cid].pts
+        # within 5 std errors; pts from one match have std dev under 1.5
+        assert avg_pts == pytest.approx(float(exp_pts), abs=5 * 1.5 / simulations**0.5)
+
+
+def test_aggregate_batch_ranks_by_pts_gd_gf():
+    pts = np.array([[3, 3, 1], [0, 4, 4]])
+    gd = np.array([[1, 2, 0], [0, 1, 1]])
+    gf = np.array([[5, 5, 1], [0, 2, 3]])
+
+    totals = model.aggregate_batch(pts, gd, gf)
+
+    # sim 0: club 1 (gd), club 0, club 2; sim 1: club 2 (gf), club 1, club 0
+    np.testing.assert_array_equal(totals[:, :3], [[0, 1, 1], [1, 1, 0], [1, 0, 1]])
+    np.testing.assert_array_equal(totals[:, 3], pts.sum(axis=0))
+    np.testing.assert_array_equal(totals[:, 4], gd.sum(axis=0))
+    np.testing.assert_array_equal(totals[:, 5], (pts * pts).sum(axis=0))
+
+
+def test_pts_distributions_match_enumeration():
+    rng = np.random.default_rng(4)
+    matches = [(0, 1), (1, 2), (0, 2), (2, 0), (1, 0)]
+    prob_1, prob_2 = rng.uniform(0.2, 0.4, (2, len(matches)))
+    prob_d = 1 - prob_1 - prob_2
+
+    dists = model.compute_pts_distributions(matches, 3, prob_1, prob_2, prob_d)
+
+    expected = np.zeros_like(dists)
+    # results: 0 club 1 wins, 1 draw, 2 club 2 wins
+    for results in itertools.product(range(3), repeat=len(matches)):
+        p = np.prod([(prob_1, prob_d, prob_2)[r][k] for k, r in enumerate(results)])
+        pts = [0, 0, 0]
+        for (i1, i2), r in zip(matches, results):
+            pts[i1] += (3, 1, 0)[r]
+            pts[i2] += (0, 1, 3)[r]
+        for i in range(3):
+            expected[i, pts[i]] += p
+    np.testing.assert_allclose(dists, expected, atol=1e-15)
+
+
+def test_sim_expected_approximates_sim_from_date(league, monkeypatch):
+    table_map, clubs_map, matches = league
+    monkeypatch.setattr(
+        model.db,
+        "get_matches_sim",
+        lambda *args: [
+            SimpleNamespace(club_id_1=c1, club_id_2=c2, id=match_id)
+            for c1, c2, match_id in matches
+        ],
+    )
+    monkeypatch.setattr(model, "PROCESSES", 2)
+    simulations = 20000
+
+    def project(expected_threshold: int) -> dict:
+        return model.sim_from_date(
+            1,
+            2024,
+            date(2025, 5, 1),
+            table_map,
+            clubs_map,
+            AVG_BASE,
+            HOME_ADVANTAGE,
+            simulations=simulations,
+            seed=0,
+            expected_threshold=expected_threshold,
+        )
+
+    try:
+        full = project(0)
+        expected = project(len(matches) + 1)
+    finally:
+        model.close_sim_pool()
+
+    for cid in table_map:
+        assert expected[cid].pts_std_error == 0
+        assert sum(expected[cid].counts) == simulations
+        # avg pts and gd agree within sampling noise of full simulation
+        assert expected[cid].total_pts / simulations == pytest.approx(
+            full[cid].total_pts / simulations, abs=5 * full[cid].pts_std_error
+        )
+        assert expected[cid].total_gd / simulations == pytest.approx(
+            full[cid].total_gd / simulations, abs=0.1
+        )
+        # positions only approximate full simulation, since projected goals are
+        # frozen; this is why sim_expected is opt-in
+        np.testing.assert_allclose(
+            np.array(expected[cid].counts) / simulations,
+            np.array(full[cid].counts) / simulations,
+            atol=0.08,
+        )
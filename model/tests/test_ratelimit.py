@@ -0,0 +1,111 @@
+"""
+Tests of the file-backed token bucket shared by scrapers.
+"""
+
+import multiprocessing
+import pytest
+import threading
+import time
+from efi import ratelimit
+from efi.ratelimit import RateLimiter
+
+
+@pytest.fixture(autouse=True)
+def bucket_dir(tmp_path, monkeypatch) -> str:
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_DIR", str(tmp_path))
+    return str(tmp_path)
+
+
+@pytest.fixture
+def clock(monkeypatch) -> list[float]:
+    # wall clock seen by limiters, set by tests
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "time", lambda: now[0])
+    return now
+
+
+def acquire_times(bucket_dir: str, rate: float, n: int) -> list[float]:
+    # runs in a fresh interpreter, so the test's monkeypatch is not inherited
+    ratelimit.RATE_LIMIT_DIR = bucket_dir
+    limiter = RateLimiter("shared", rate)
+    starts = []
+    for _ in range(n):
+        limiter.acquire()
+        starts.append(time.time())
+    return starts
+
+
+def assert_rate(starts: list[float], rate: float):
+    # kth request starts at least k / rate after the first, allowing for
+    # jitter in sleep wakeups
+    starts = sorted(starts)
+    for k, start in enumerate(starts):
+        assert start - starts[0] >= k / rate - 0.02
+
+
+def test_waits_only_remaining_time(clock):
+    limiter = RateLimiter("fbref", 1 / 6)
+
+    assert limiter.reserve() == 0
+    clock[0] += 2.5  # previous response took 2.5s to fetch and parse
+    assert limiter.reserve() == pytest.approx(3.5)
+    # next token is reserved 6s after the previous one
+    assert limiter.reserve() == pytest.approx(9.5)
+    clock[0] += 20
+    assert limiter.reserve() == 0
+
+
+def test_burst_up_to_capacity(clock):
+    limiter = RateLimiter("burst", 10, capacity=3)
+
+    assert [limiter.reserve() for _ in range(4)] == pytest.approx([0, 0, 0, 0.1])
+    clock[0] += 60  # refills to capacity, no further
+    assert [limiter.reserve() for _ in range(4)] == pytest.approx([0, 0, 0, 0.1])
+
+
+def test_clock_stepping_back_does_not_drain_bucket(clock):
+    limiter = RateLimiter("clock", 1)
+
+    assert limiter.reserve() == 0
+    clock[0] -= 3600
+    assert limiter.reserve() == pytest.approx(1)
+
+
+def test_same_name_shares_bucket(clock):
+    a = RateLimiter("shared", 1)
+    b = RateLimiter("shared", 1)
+    c = RateLimiter("other", 1)
+
+    assert a.reserve() == 0
+    assert b.reserve() == pytest.approx(1)
+    assert c.reserve() == 0
+
+
+def test_threads_share_bucket():
+    rate = 20
+    limiter = RateLimiter("shared", rate)
+    starts = []
+
+    def run():
+        for _ in range(3):
+            limiter.acquire()
+            starts.append(time.time())
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(starts) == 9
+    assert_rate(starts, rate)
+
+
+def test_processes_share_bucket(bucket_dir):
+    rate = 20
+    with multiprocessing.get_context("spawn").Pool(3) as pool:
+        results = pool.starmap(acquire_times, [(bucket_dir, rate, 3)] * 3)
+    starts = [start for r in results for start in r]
+
+    assert len(starts) == 9
+    assert_rate(starts, rate)
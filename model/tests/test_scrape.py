@@ -0,0 +1,200 @@
+"""
+Tests of Fotmob's batch match stats against a local server replaying recorded
+FotMob match details.
+"""
+
+import asyncio
+import json
+import os
+import pytest
+import threading
+import time
+from aiohttp import web
+from efi import cache, ratelimit, scrape
+from efi.data import Club
+from efi.ratelimit import RateLimiter
+
+MATCH_DETAILS = os.path.join(
+    os.path.dirname(__file__), "data", "fotmob_match_details.json"
+)
+LATENCY = 0.05  # seconds the server takes to respond to each request
+
+
+@pytest.fixture
+def details() -> dict[str, dict]:
+    with open(MATCH_DETAILS) as fd:
+        return json.load(fd)
+
+
+@pytest.fixture
+def clubs(details: dict[str, dict]) -> dict[str, Club]:
+    fotmob_ids = {
+        str(d["general"][team]["id"])
+        for d in details.values()
+        for team in ("homeTeam", "awayTeam")
+    }
+    return {
+        fotmob_id: Club(
+            id=i,
+            name=fotmob_id,
+            short_name=fotmob_id,
+            abbrev=fotmob_id,
+            country_code="GB",
+            icon_link="",
+            official_id="",
+            fotmob_id=fotmob_id,
+            fbref_id="",
+            transfermarkt_id="",
+            transfermarkt_path="",
+        )
+        for i, fotmob_id in enumerate(sorted(fotmob_ids), 1)
+    }
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(tmp_path, monkeypatch):
+    # every request must reach the server
+    monkeypatch.delenv("EFI_HTTP_MODE", raising=False)
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path / "http_cache"))
+    # and rate limit buckets start full
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_DIR", str(tmp_path))
+
+
+@pytest.fixture
+def server(details: dict[str, dict]):
+    """Serves recorded match details on localhost from a background thread.
+
+    Yields:
+        dict: "url" of server, "starts" of requests in monotonic time, and
+            "max_in_flight" requests
+    """
+    stats = {"starts": [], "in_flight": 0, "max_in_flight": 0}
+
+    async def match_details(request: web.Request) -> web.Response:
+        stats["starts"].append(time.monotonic())
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        await asyncio.sleep(LATENCY)
+        stats["in_flight"] -= 1
+        return web.json_response(
+            details.get(request.query["matchId"], {"error": "Not found"})
+        )
+
+    app = web.Application()
+    app.router.add_get("/api/matchDetails", match_details)
+    runner = web.AppRunner(app)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = runner.addresses[0][1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    stats["url"] = f"http://127.0.0.1:{port}"
+    yield stats
+
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.run_until_complete(runner.cleanup())
+    loop.close()
+
+
+def set_limits(monkeypatch, concurrency: int, requests_per_second: float):
+    # fresh class-level limits, so earlier tests' requests don't count
+    monkeypatch.setattr(
+        scrape.Fotmob, "limiter", RateLimiter("fotmob", requests_per_second)
+    )
+    monkeypatch.setattr(scrape.Fotmob, "slots", threading.BoundedSemaphore(concurrency))
+
+
+def get_stats(server: dict, clubs: dict[str, Club], ids: list[str]) -> list:
+    fotmob = scrape.Fotmob(base_url=server["url"], headers_url=None)
+    return fotmob.get_completed_matches_stats(1, 2024, ids, clubs)
+
+
+def run_in_threads(targets: list[tuple]):
+    threads = [threading.Thread(target=f, args=args) for f, *args in targets]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def assert_rate(starts: list[float], rate: float):
+    # kth request starts at least k / rate after the first, allowing for
+    # jitter in event loop wakeups
+    starts = sorted(starts)
+    for k, start in enumerate(starts):
+        assert start - starts[0] >= k / rate - 0.02
+
+
+def test_batch_matches_sequential_in_input_order(server, details, clubs, monkeypatch):
+    set_limits(monkeypatch, 8, 100)
+    ids = list(reversed(details))
+
+    matches = get_stats(server, clubs, ids)
+
+    assert len(server["starts"]) == len(ids)
+    fotmob = scrape.Fotmob(base_url=server["url"], headers_url=None)
+    assert matches == [
+        fotmob.get_completed_match_stats(1, 2024, id, clubs) for id in ids
+    ]
+    for id, m in zip(ids, matches):
+        assert m.score_1 == details[id]["header"]["teams"][0]["score"]
+        assert m.score_2 == details[id]["header"]["teams"][1]["score"]
+
+
+def test_batch_concurrency_bound(server, details, clubs, monkeypatch):
+    set_limits(monkeypatch, 3, 1000)
+    get_stats(server, clubs, list(details))
+
+    assert len(server["starts"]) == len(details)
+    assert 1 < server["max_in_flight"] <= 3
+
+
+def test_batch_rate_limit(server, details, clubs, monkeypatch):
+    rate = 20
+    set_limits(monkeypatch, 8, rate)
+    get_stats(server, clubs, list(details))
+
+    assert_rate(server["starts"], rate)
+
+
+def test_overlapping_batches_share_rate_limit(server, details, clubs, monkeypatch):
+    rate = 20
+    set_limits(monkeypatch, 8, rate)
+    fotmob = scrape.Fotmob(base_url=server["url"], headers_url=None)
+    ids = list(details)
+
+    run_in_threads(
+        [
+            (fotmob.get_completed_matches_stats, 1, 2024, part, clubs)
+            for part in (ids[::2], ids[1::2])
+        ]
+    )
+
+    assert len(server["starts"]) == len(ids)
+    assert_rate(server["starts"], rate)
+
+
+def test_instances_share_rate_limit(server, details, clubs, monkeypatch):
+    # as in update_all, where each worker thread builds its own Fotmob
+    rate = 20
+    set_limits(monkeypatch, 8, rate)
+    ids = list(details)
+
+    run_in_threads([(get_stats, server, clubs, part) for part in (ids[::2], ids[1::2])])
+
+    assert len(server["starts"]) == len(ids)
+    assert_rate(server["starts"], rate)
+
+
+def test_instances_share_concurrency_bound(server, details, clubs, monkeypatch):
+    set_limits(monkeypatch, 2, 1000)
+    ids = list(details)
+
+    run_in_threads([(get_stats, server, clubs, part) for part in (ids[::2], ids[1::2])])
+
+    assert len(server["starts"]) == len(ids)
+    assert 1 < server["max_in_flight"] <= 2